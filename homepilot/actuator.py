@@ -3,17 +3,27 @@ from .const import (
     APICAP_DEVICE_TYPE_LOC,
     APICAP_ID_DEVICE_LOC,
     APICAP_NAME_DEVICE_LOC,
-    APICAP_PING_CMD,
     APICAP_PROD_CODE_DEVICE_LOC,
     APICAP_PROT_ID_DEVICE_LOC,
     APICAP_VERSION_CFG,
-    SUPPORTED_DEVICES,
+    DEVTYPE_ACTUATOR,
 )
 from .api import HomePilotApi
+from .decoder import StateField, is_not_zero
 from .device import HomePilotDevice
+from .profile import get_profile
 
 
 class HomePilotActuator(HomePilotDevice):
+    __slots__ = (
+        "_is_on", "_brightness",
+    )
+
+    _devtype: str = DEVTYPE_ACTUATOR
+    _state_fields = (
+        StateField(None, "statusesMap", "Position", "_is_on", is_not_zero, required=True),
+        StateField(None, "statusesMap", "Position", "_brightness", required=True),
+    )
     _is_on: bool
     _brightness: int
 
@@ -56,21 +66,15 @@ class HomePilotActuator(HomePilotDevice):
             uid=device_map[APICAP_PROT_ID_DEVICE_LOC]["value"],
             name=device_map[APICAP_NAME_DEVICE_LOC]["value"],
             device_number=device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"],
-            model=SUPPORTED_DEVICES[device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"]][
-                "name"
-            ]
-            if device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"] in SUPPORTED_DEVICES
-            else "Generic Device",
             fw_version=device_map[APICAP_VERSION_CFG]["value"]
             if APICAP_VERSION_CFG in device_map else "",
             device_group=device_map[APICAP_DEVICE_TYPE_LOC]["value"],
-            has_ping_cmd=APICAP_PING_CMD in device_map,
+            **get_profile(HomePilotActuator, device_map)._asdict(),
         )
 
     async def update_state(self, state, api):
         await super().update_state(state, api)
-        self.is_on = state["statusesMap"]["Position"] != 0
-        self.brightness = state["statusesMap"]["Position"]
+        self.reconcile_pending()
 
     @property
     def is_on(self) -> bool:
@@ -78,7 +82,7 @@ class HomePilotActuator(HomePilotDevice):
 
     @is_on.setter
     def is_on(self, is_on):
-        self._is_on = is_on
+        self._set_state("_is_on", is_on)
 
     @property
     def brightness(self) -> int:
@@ -86,16 +90,21 @@ class HomePilotActuator(HomePilotDevice):
 
     @brightness.setter
     def brightness(self, brightness):
-        self._brightness = brightness
+        self._set_state("_brightness", brightness)
 
     async def async_turn_on(self) -> None:
         await self.api.async_turn_on(self.did)
+        self.set_optimistic_value("is_on", True)
 
     async def async_turn_off(self) -> None:
         await self.api.async_turn_off(self.did)
+        self.set_optimistic_value("is_on", False)
+        self.set_optimistic_value("brightness", 0)
 
     async def async_set_brightness(self, new_brightness) -> None:
         await self.api.async_set_cover_position(self.did, new_brightness)
+        self.set_optimistic_value("is_on", new_brightness != 0)
+        self.set_optimistic_value("brightness", new_brightness)
 
     async def async_toggle(self) -> None:
         if self.is_on:
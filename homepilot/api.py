@@ -1,4 +1,6 @@
+import asyncio
 import hashlib
+import time
 from typing import Any
 
 import aiohttp
@@ -18,6 +20,15 @@ from .const import (
     APICAP_STOP_SLAT_CMD,
     APICAP_VENTIL_POS_CFG,
     APICAP_VENTIL_POS_MODE_CFG,
+    DEVTYPES,
+)
+from .scheduler import (
+    CommandScheduler,
+    Priority,
+    RequestLimiter,
+    bulk_commands,
+    command_priority,
+    request_durations,
 )
 
 
@@ -26,10 +37,23 @@ class HomePilotApi:
     _password: str
     _authenticated: bool = False
     _cookie_jar: Any = None
-
-    def __init__(self, host, password) -> None:
+    _auth_lock: asyncio.Lock
+    _command_scheduler: CommandScheduler
+    _request_limiter: RequestLimiter
+
+    def __init__(
+        self,
+        host,
+        password,
+        frame_spacing: float = 0,
+        burst_size: int = 1,
+        max_concurrent_requests: int | None = None,
+    ) -> None:
         self._host = host
         self._password = password
+        self._auth_lock = asyncio.Lock()
+        self._command_scheduler = CommandScheduler(frame_spacing, burst_size)
+        self._request_limiter = RequestLimiter(max_concurrent_requests)
 
     @staticmethod
     async def test_connection(host: str) -> str:
@@ -72,13 +96,19 @@ class HomePilotApi:
             return session.cookie_jar
 
     async def authenticate(self):
-        if not self.authenticated and self.password != "":
-            self.cookie_jar = await HomePilotApi.test_auth(self.host, self.password)
-            self._authenticated = True
+        if self.authenticated or self.password == "":
+            return
+        async with self._auth_lock:
+            # another request may have logged in while this one waited
+            if not self.authenticated:
+                self.cookie_jar = await HomePilotApi.test_auth(self.host, self.password)
+                self._authenticated = True
 
     async def get_devices(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.POLL), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(f"http://{self.host}/devices") as response:
                 if response.status == 401:
                     raise AuthError()
@@ -92,7 +122,9 @@ class HomePilotApi:
 
     async def get_device(self, did):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.REFRESH), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(f"http://{self.host}/devices/{did}") as response:
                 response = await response.json()
                 if response["error_code"] != 0:
@@ -104,7 +136,9 @@ class HomePilotApi:
 
     async def async_get_fw_status(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.POLL), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(
                 f"http://{self.host}/service/system-update-image/status"
             ) as response:
@@ -115,7 +149,9 @@ class HomePilotApi:
 
     async def async_get_interfaces(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.POLL), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(
                 f"http://{self.host}/service/system/networkmgr/v1/interfaces"
             ) as response:
@@ -126,7 +162,9 @@ class HomePilotApi:
 
     async def async_get_fw_version(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.POLL), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(
                 f"http://{self.host}/service/system-update-image/version"
             ) as response:
@@ -137,7 +175,9 @@ class HomePilotApi:
 
     async def async_get_nodename(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.POLL), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(
                 f"http://{self.host}/service/system/networkmgr/v1/nodename"
             ) as response:
@@ -148,7 +188,9 @@ class HomePilotApi:
 
     async def async_get_led_status(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.POLL), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(
                 f"http://{self.host}/service/system/leds/status"
             ) as response:
@@ -159,7 +201,9 @@ class HomePilotApi:
 
     async def async_get_device_state(self, did):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.REFRESH), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.get(
                 f"http://{self.host}/v4/devices/{did}"
             ) as response:
@@ -173,194 +217,127 @@ class HomePilotApi:
                         device = {}
                 return device
 
-    async def async_get_devices_state(self):
+    async def async_get_devices_state(self, devtypes=None):
+        """Returns the state of all devices, or only of the given devtypes"""
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.get(
-                f"http://{self.host}/v4/devices?devtype=Actuator"
-            ) as response:
-                if response.status == 401:
-                    raise AuthError()
-                response = await response.json()
-                if response["response"] != "get_visible_devices":
-                    actuators = {}
-                else:
-                    if response["devices"]:
-                        devices = response["devices"]
-                        actuators = {str(device["did"]): device for device in devices}
-                    else:
-                        actuators = {}
-            async with session.get(
-                f"http://{self.host}/v4/devices?devtype=Sensor"
-            ) as response:
-                if response.status == 401:
-                    raise AuthError()
-                response = await response.json()
-                if response["response"] != "get_meters":
-                    sensors = {}
-                else:
-                    if response["meters"]:
-                        devices = response["meters"]
-                        sensors = {str(device["did"]): device for device in devices}
-                    else:
-                        sensors = {}
-            async with session.get(
-                f"http://{self.host}/v4/devices?devtype=Transmitter"
-            ) as response:
-                if response.status == 401:
-                    raise AuthError()
-                response = await response.json()
-                if response["response"] != "get_transmitters":
-                    transmitters = {}
-                else:
-                    if response["transmitters"]:
-                        devices = response["transmitters"]
-                        transmitters = {str(device["did"]): device for device in devices}
-                    else:
-                        transmitters = {}
-            return {**actuators, **sensors, **transmitters}
+        states = {}
+        async with self._request_slot(Priority.POLL), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
+            for devtype in DEVTYPES if devtypes is None else devtypes:
+                states.update(await self._async_get_devtype_state(session, devtype))
+        return states
+
+    async def _async_get_devtype_state(self, session, devtype):
+        response_name, devices_key = DEVTYPES[devtype]
+        async with session.get(
+            f"http://{self.host}/v4/devices?devtype={devtype}"
+        ) as response:
+            if response.status == 401:
+                raise AuthError()
+            response = await response.json()
+            if response["response"] != response_name or not response[devices_key]:
+                return {}
+            return {str(device["did"]): device for device in response[devices_key]}
 
-    async def async_ping(self, did):
+    async def _async_send_command(self, did, command):
+        """Sends a command to a device once the command scheduler releases it"""
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        priority = command_priority.get()
+        await self.command_scheduler.acquire(priority)
+        async with self._request_slot(priority), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
+            started = time.monotonic()
             async with session.put(
-                f"http://{self.host}/devices/{did}", json={"name": APICAP_PING_CMD}
+                f"http://{self.host}/devices/{did}", json=command
             ) as response:
-                return await response.json()
+                response = await response.json()
+            durations = request_durations.get()
+            if durations is not None:
+                durations.append(time.monotonic() - started)
+            return response
+
+    def _request_slot(self, priority: Priority):
+        """Waits for a free request slot, served in priority order"""
+        return self.request_limiter.slot(priority)
+
+    def bulk_commands(self):
+        """Context manager that sends the commands issued within it with bulk
+        priority, e.g. for scenes and group actions"""
+        return bulk_commands()
+
+    async def async_ping(self, did):
+        return await self._async_send_command(did, {"name": APICAP_PING_CMD})
 
     async def async_open_cover(self, did):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}", json={"name": APICAP_POS_UP_CMD}
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(did, {"name": APICAP_POS_UP_CMD})
 
     async def async_close_cover(self, did):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}", json={"name": APICAP_POS_DOWN_CMD}
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(did, {"name": APICAP_POS_DOWN_CMD})
 
     async def async_stop_cover(self, did):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}", json={"name": APICAP_STOP_CMD}
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(did, {"name": APICAP_STOP_CMD})
 
     async def async_set_cover_position(self, did, position):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_GOTO_POS_CMD, "value": position},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_GOTO_POS_CMD, "value": position}
+        )
 
     async def async_open_cover_tilt(self, did) -> None:
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_SET_SLAT_POS_CMD, "value": 0},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_SET_SLAT_POS_CMD, "value": 0}
+        )
 
     async def async_close_cover_tilt(self, did) -> None:
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_SET_SLAT_POS_CMD, "value": 100},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_SET_SLAT_POS_CMD, "value": 100}
+        )
 
     async def async_set_cover_tilt_position(self, did, position) -> None:
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_SET_SLAT_POS_CMD, "value": position},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_SET_SLAT_POS_CMD, "value": position}
+        )
 
     async def async_stop_cover_tilt(self, did) -> None:
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_STOP_SLAT_CMD},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(did, {"name": APICAP_STOP_SLAT_CMD})
 
     async def async_set_ventilation_position_mode(self, did, mode) -> None:
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_VENTIL_POS_MODE_CFG, "value": mode},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_VENTIL_POS_MODE_CFG, "value": mode}
+        )
 
     async def async_set_ventilation_position(self, did, position) -> None:
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_VENTIL_POS_CFG, "value": str(int(position))},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_VENTIL_POS_CFG, "value": str(int(position))}
+        )
 
     async def async_turn_on(self, did):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}", json={"name": APICAP_TURN_ON_CMD}
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(did, {"name": APICAP_TURN_ON_CMD})
 
     async def async_turn_off(self, did):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}", json={"name": APICAP_TURN_OFF_CMD}
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(did, {"name": APICAP_TURN_OFF_CMD})
 
     async def async_set_target_temperature(self, did, temperature):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_TARGET_TEMPERATURE_CFG, "value": temperature},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_TARGET_TEMPERATURE_CFG, "value": temperature}
+        )
 
     async def async_set_auto_mode(self, did, auto_mode):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": APICAP_AUTO_MODE_CFG, "value": auto_mode},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": APICAP_AUTO_MODE_CFG, "value": auto_mode}
+        )
 
     async def async_set_temperature_thresh_cfg(self, did, thresh_number, temperature):
-        await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
-            async with session.put(
-                f"http://{self.host}/devices/{did}",
-                json={"name": f"TEMPERATURE_THRESH_{thresh_number}_CFG", "value": temperature},
-            ) as response:
-                return await response.json()
+        return await self._async_send_command(
+            did, {"name": f"TEMPERATURE_THRESH_{thresh_number}_CFG", "value": temperature}
+        )
 
     async def async_turn_led_on(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.COMMAND), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.post(
                 f"http://{self.host}/service/system/leds/enable"
             ) as response:
@@ -368,7 +345,9 @@ class HomePilotApi:
 
     async def async_turn_led_off(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.COMMAND), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.post(
                 f"http://{self.host}/service/system/leds/disable"
             ) as response:
@@ -376,7 +355,9 @@ class HomePilotApi:
 
     async def async_set_auto_update_on(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.COMMAND), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.put(
                 f"http://{self.host}/service/system-update-image/auto_update",
                 json={"auto_update": True},
@@ -385,7 +366,9 @@ class HomePilotApi:
 
     async def async_set_auto_update_off(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.COMMAND), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.put(
                 f"http://{self.host}/service/system-update-image/auto_update",
                 json={"auto_update": False},
@@ -394,7 +377,9 @@ class HomePilotApi:
 
     async def async_update_firmware(self):
         await self.authenticate()
-        async with aiohttp.ClientSession(cookie_jar=self.cookie_jar) as session:
+        async with self._request_slot(Priority.COMMAND), aiohttp.ClientSession(
+            cookie_jar=self.cookie_jar
+        ) as session:
             async with session.post(
                 f"http://{self.host}/service/system-update-image/startupdate"
             ) as response:
@@ -412,6 +397,14 @@ class HomePilotApi:
     def authenticated(self):
         return self._authenticated
 
+    @property
+    def command_scheduler(self) -> CommandScheduler:
+        return self._command_scheduler
+
+    @property
+    def request_limiter(self) -> RequestLimiter:
+        return self._request_limiter
+
     @property
     def cookie_jar(self):
         return self._cookie_jar
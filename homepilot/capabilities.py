@@ -0,0 +1,59 @@
+""" Views over the capabilities of a device in HomePilot GW API responses """
+from collections.abc import Mapping
+
+# Fields of a capability, None when the response omits them
+CAPABILITY_FIELDS = (
+    "value", "read_only", "timestamp", "min_value", "max_value", "step_size",
+)
+_FIELDS = frozenset(CAPABILITY_FIELDS)
+
+
+class Capability(Mapping):
+    """Read-only view of one capability of an API response"""
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, raw) -> None:
+        self._raw = raw
+
+    def __getitem__(self, field):
+        if field in _FIELDS:
+            return self._raw.get(field)
+        raise KeyError(field)
+
+    def __iter__(self):
+        return iter(CAPABILITY_FIELDS)
+
+    def __len__(self) -> int:
+        return len(CAPABILITY_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Capability({dict(self)!r})"
+
+
+class CapabilityMap(Mapping):
+    """Read-only map of capability name to Capability over the capabilities
+    list of an API response. The response is not copied: only a name index is
+    built, the views are created on access."""
+
+    __slots__ = ("_index",)
+
+    def __init__(self, device) -> None:
+        self._index = {
+            capability["name"]: capability for capability in device["capabilities"]
+        }
+
+    def __getitem__(self, name) -> Capability:
+        return Capability(self._index[name])
+
+    def __contains__(self, name) -> bool:
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"CapabilityMap({list(self)!r})"
@@ -59,6 +59,17 @@ APICAP_TEMPERATURE_THRESH_2_CFG = "TEMPERATURE_THRESH_2_CFG"
 APICAP_TEMPERATURE_THRESH_3_CFG = "TEMPERATURE_THRESH_3_CFG"
 APICAP_TEMPERATURE_THRESH_4_CFG = "TEMPERATURE_THRESH_4_CFG"
 
+# Device types of the /v4/devices listings
+DEVTYPE_ACTUATOR = "Actuator"
+DEVTYPE_SENSOR = "Sensor"
+DEVTYPE_TRANSMITTER = "Transmitter"
+# devtype: (response name, devices key)
+DEVTYPES = {
+    DEVTYPE_ACTUATOR: ("get_visible_devices", "devices"),
+    DEVTYPE_SENSOR: ("get_meters", "meters"),
+    DEVTYPE_TRANSMITTER: ("get_transmitters", "transmitters"),
+}
+
 SUPPORTED_DEVICES = {
     "35001164": {"name": "DuoFern Switch actuator",
                  "Type": SWITCH_ACTUATOR_TYPE},
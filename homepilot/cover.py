@@ -1,5 +1,9 @@
 import asyncio
+import logging
+import time
 from enum import Enum
+from typing import NamedTuple
+
 from .const import (
     APICAP_DEVICE_TYPE_LOC,
     APICAP_GOTO_POS_CMD,
@@ -12,10 +16,21 @@ from .const import (
     APICAP_VERSION_CFG,
     APICAP_VENTIL_POS_CFG,
     APICAP_VENTIL_POS_MODE_CFG,
-    SUPPORTED_DEVICES,
+    DEVTYPE_ACTUATOR,
 )
 from .api import HomePilotApi
+from .decoder import StateField, inverted_percent
 from .device import HomePilotDevice
+from .profile import get_model, get_profile, intern_profile
+
+_LOGGER = logging.getLogger(__name__)
+
+# Post-command movement tracking
+TRACK_INTERVAL = 0.5
+TRACK_TIMEOUT = 120
+TRACK_STABLE_POLLS = 3
+# Seconds the motor gets to start moving before tracking gives up
+TRACK_START_TIMEOUT = 5
 
 
 class CoverType(Enum):
@@ -23,19 +38,107 @@ class CoverType(Enum):
     GARAGE = 8
 
 
+class CoverProfile(NamedTuple):
+    model: str
+    has_ping_cmd: bool
+    can_set_position: bool
+    cover_type: int
+    has_tilt: bool
+    can_set_tilt_position: bool
+    has_ventilation_position_config: bool
+
+
+class CoverTravelModel:
+    """Travel speed of a cover (percent per second) learned from observed
+    position changes, used to interpolate the position of a moving cover"""
+
+    __slots__ = (
+        "_speed", "_position", "_timestamp", "_target",
+    )
+
+    SPEED_SMOOTHING = 0.3
+
+    def __init__(self) -> None:
+        self._speed = None
+        self._position = None
+        self._timestamp = None
+        self._target = None
+
+    def start(self, position: int, target: int | None, timestamp: float) -> None:
+        self._position = position
+        self._timestamp = timestamp
+        self._target = target
+
+    def stop(self) -> None:
+        self._target = None
+
+    def observe(self, position: int, timestamp: float) -> None:
+        if (
+            self.moving
+            and self._position is not None
+            and position != self._position
+            and position != self._target
+            and timestamp > self._timestamp
+        ):
+            speed = abs(position - self._position) / (timestamp - self._timestamp)
+            self._speed = speed if self._speed is None else (
+                self.SPEED_SMOOTHING * speed + (1 - self.SPEED_SMOOTHING) * self._speed
+            )
+        self._position = position
+        self._timestamp = timestamp
+        if position == self._target:
+            self.stop()
+
+    def position_at(self, timestamp: float) -> int | None:
+        if not self.moving or self._speed is None:
+            return self._position
+        travelled = self._speed * (timestamp - self._timestamp)
+        if self._target > self._position:
+            return round(min(self._target, self._position + travelled))
+        return round(max(self._target, self._position - travelled))
+
+    def arrival_time(self) -> float | None:
+        if not self.moving or not self._speed:
+            return None
+        return self._timestamp + abs(self._target - self._position) / self._speed
+
+    @property
+    def moving(self) -> bool:
+        return self._target is not None and self._position is not None
+
+    @property
+    def speed(self) -> float | None:
+        return self._speed
+
+
 class HomePilotCover(HomePilotDevice):
-    _can_set_position: bool
-    _cover_type: int
-    _has_tilt: bool
-    _can_set_tilt_position: bool
-    _cover_position: int = None
-    _cover_tilt_position: int = None
+    __slots__ = (
+        "_cover_position", "_cover_tilt_position", "_is_closed", "_is_closing",
+        "_is_opening", "_ventilation_position_mode", "_ventilation_position",
+        "_track_movement", "_track_interval", "_predict_movement", "_travel_model",
+        "_tracking_task", "_target_position",
+    )
+
+    _devtype: str = DEVTYPE_ACTUATOR
+    _state_fields = (
+        StateField(None, "statusesMap", "Position", "_cover_position", inverted_percent,
+                   required=True),
+    )
+    _profile_capabilities = ((APICAP_DEVICE_TYPE_LOC, "value"),)
+    _cover_position: int | None
+    _cover_tilt_position: int | None
     _is_closed: bool
     _is_closing: bool
     _is_opening: bool
-    _has_ventilation_position_config: bool
     _ventilation_position_mode: bool
     _ventilation_position: int
+    _track_movement: bool
+    _track_interval: float
+    _predict_movement: bool
+    _travel_model: CoverTravelModel
+    _tracking_task: asyncio.Task | None
+    _target_position: int | None
+    _profile: CoverProfile
 
     def __init__(
         self,
@@ -65,11 +168,25 @@ class HomePilotCover(HomePilotDevice):
             device_group=device_group,
             has_ping_cmd=has_ping_cmd,
         )
-        self._can_set_position = can_set_position
-        self._cover_type = cover_type
-        self._has_tilt = has_tilt
-        self._can_set_tilt_position = can_set_tilt_position
-        self._has_ventilation_position_config = has_ventilation_position_config
+        self._profile = intern_profile(CoverProfile(
+            model,
+            has_ping_cmd,
+            can_set_position,
+            cover_type,
+            has_tilt,
+            can_set_tilt_position,
+            has_ventilation_position_config,
+        ))
+        self._cover_position = None
+        self._cover_tilt_position = None
+        self._is_closing = False
+        self._is_opening = False
+        self._track_movement = False
+        self._track_interval = TRACK_INTERVAL
+        self._predict_movement = False
+        self._travel_model = CoverTravelModel()
+        self._tracking_task = None
+        self._target_position = None
 
     @staticmethod
     def build_from_api(api: HomePilotApi, did: str):
@@ -86,14 +203,16 @@ class HomePilotCover(HomePilotDevice):
             uid=device_map[APICAP_PROT_ID_DEVICE_LOC]["value"],
             name=device_map[APICAP_NAME_DEVICE_LOC]["value"],
             device_number=device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"],
-            model=SUPPORTED_DEVICES[device_map[APICAP_PROD_CODE_DEVICE_LOC][
-                "value"]]["name"]
-            if device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"] in
-            SUPPORTED_DEVICES
-            else "Generic Device",
             fw_version=device_map[APICAP_VERSION_CFG]["value"]
             if APICAP_VERSION_CFG in device_map else "",
             device_group=device_map[APICAP_DEVICE_TYPE_LOC]["value"],
+            **get_profile(HomePilotCover, device_map)._asdict(),
+        )
+
+    @staticmethod
+    def derive_profile(device_map) -> CoverProfile:
+        return CoverProfile(
+            model=get_model(device_map),
             has_ping_cmd=APICAP_PING_CMD in device_map,
             can_set_position=APICAP_GOTO_POS_CMD in device_map,
             cover_type=int(device_map[APICAP_DEVICE_TYPE_LOC]["value"]),
@@ -103,37 +222,136 @@ class HomePilotCover(HomePilotDevice):
         )
 
     async def update_state(self, state, api):
+        previous_position = self._cover_position
         await super().update_state(state, api)
-        self.cover_position = 100 - state["statusesMap"]["Position"]
+        self._travel_model.observe(self._cover_position, time.monotonic())
         if self.has_tilt:
             if "slatposition" not in state["statusesMap"]:
                 self.has_tilt = False
                 self.can_set_tilt_position = False
             else:
-                self.cover_tilt_position = 100 - state["statusesMap"][
-                    "slatposition"]
-        self.is_closed = self.cover_position == 0
-        self.is_closing = False
-        self.is_opening = False
+                self.cover_tilt_position = inverted_percent(
+                    state["statusesMap"]["slatposition"]
+                )
+        self.is_closed = self._cover_position == 0
+        if self.is_tracking_movement:
+            if previous_position is not None and self._cover_position != previous_position:
+                self.is_opening = self._cover_position > previous_position
+                self.is_closing = self._cover_position < previous_position
+        else:
+            self.is_closing = False
+            self.is_opening = False
+
+    def update_config(self, device_map) -> bool:
         if self.has_ventilation_position_config:
-            device = await api.get_device(self.did)
-            device_map = HomePilotDevice.get_capabilities_map(device)
+            if APICAP_VENTIL_POS_MODE_CFG not in device_map or APICAP_VENTIL_POS_CFG not in device_map:
+                return False
             self.ventilation_position_mode = device_map[APICAP_VENTIL_POS_MODE_CFG]["value"] == "true"
             self.ventilation_position = 100 - int(device_map[APICAP_VENTIL_POS_CFG]["value"])
+        return True
 
-    async def async_open_cover(self) -> None:
+    async def async_track_movement(
+        self, interval: float | None = None, timeout: float = TRACK_TIMEOUT
+    ) -> None:
+        """Polls only this cover until it reaches the target position or its
+        position stops changing once it moved, or it did not move within
+        TRACK_START_TIMEOUT seconds. With predict_movement and a
+        learned travel speed, the next poll is scheduled at the predicted
+        arrival time"""
+        if interval is None:
+            interval = self.track_interval
+        if self._tracking_task is None:
+            self._tracking_task = asyncio.current_task()
+        stable_polls = 0
+        # the motor may start after a few polls, a stopped cover is already moving
+        moved = self._target_position is None
+        started = time.monotonic()
+        deadline = started + timeout
+        try:
+            while stable_polls < TRACK_STABLE_POLLS and time.monotonic() < deadline:
+                delay = interval
+                arrival = self._travel_model.arrival_time() if self.predict_movement else None
+                if arrival is not None:
+                    delay = max(interval, arrival - time.monotonic() + interval)
+                await asyncio.sleep(delay)
+                state = await self.api.async_get_device_state(self.did)
+                if "statusesMap" not in state:
+                    break
+                previous_position = self._cover_position
+                await self.update_state(state, self.api)
+                if self._cover_position == self._target_position:
+                    break
+                if self._cover_position != previous_position:
+                    moved = True
+                    stable_polls = 0
+                elif moved:
+                    stable_polls += 1
+                elif time.monotonic() - started >= TRACK_START_TIMEOUT:
+                    break
+        except Exception:
+            _LOGGER.warning("Error tracking movement of cover %s", self.did, exc_info=True)
+        finally:
+            if self._tracking_task is asyncio.current_task():
+                self._tracking_task = None
+                self._target_position = None
+                self._travel_model.stop()
+                self.is_opening = False
+                self.is_closing = False
+
+    def _moving_to(self, target_position: int | None) -> None:
+        if self._cover_position is not None and target_position is not None:
+            self.is_opening = target_position > self._cover_position
+            self.is_closing = target_position < self._cover_position
+            self._travel_model.start(self._cover_position, target_position, time.monotonic())
+        else:
+            self._travel_model.stop()
+        if self.track_movement or self.predict_movement:
+            if self._tracking_task is not None:
+                self._tracking_task.cancel()
+            self._tracking_task = asyncio.get_running_loop().create_task(
+                self.async_track_movement()
+            )
+            self._target_position = target_position
+
+    def is_redundant_command(self, attribute: str, value, force: bool = False) -> bool:
+        # the position is about to change while the cover moves
+        if self.is_opening or self.is_closing or self.is_tracking_movement:
+            return False
+        return super().is_redundant_command(attribute, value, force)
+
+    def _reported_value(self, attribute: str):
+        if attribute == "cover_position":
+            # not the position predicted by the travel model
+            return self._cover_position
+        return super()._reported_value(attribute)
+
+    async def async_open_cover(self, force: bool = False) -> None:
+        if self.is_redundant_command("cover_position", 100, force):
+            return
         await self.api.async_open_cover(self.did)
+        self._moving_to(100)
 
-    async def async_close_cover(self) -> None:
+    async def async_close_cover(self, force: bool = False) -> None:
+        if self.is_redundant_command("cover_position", 0, force):
+            return
         await self.api.async_close_cover(self.did)
+        self._moving_to(0)
 
-    async def async_set_cover_position(self, new_position) -> None:
+    async def async_set_cover_position(self, new_position, force: bool = False) -> None:
+        if self.is_redundant_command("cover_position", new_position, force):
+            return
         if self.can_set_position:
             await self.api.async_set_cover_position(self.did,
                                                     100 - new_position)
+            self._moving_to(new_position)
 
     async def async_stop_cover(self) -> None:
         await self.api.async_stop_cover(self.did)
+        if self.is_tracking_movement:
+            self._moving_to(None)
+        else:
+            self.is_opening = False
+            self.is_closing = False
 
     async def async_open_cover_tilt(self) -> None:
         if self.has_tilt:
@@ -155,13 +373,17 @@ class HomePilotCover(HomePilotDevice):
     async def async_set_ventilation_position_mode(self, mode) -> None:
         if self.has_ventilation_position_config:
             await self.api.async_set_ventilation_position_mode(self.did, mode)
+            self.config_stale = True
 
     async def async_set_ventilation_position(self, position) -> None:
         if self.has_ventilation_position_config:
             await self.api.async_set_ventilation_position(self.did, 100 - position)
+            self.config_stale = True
 
     @property
     def cover_position(self) -> int:
+        if self.predict_movement and self._travel_model.moving:
+            return self._travel_model.position_at(time.monotonic())
         return self._cover_position
 
     @property
@@ -170,11 +392,11 @@ class HomePilotCover(HomePilotDevice):
 
     @cover_tilt_position.setter
     def cover_tilt_position(self, cover_tilt_position):
-        self._cover_tilt_position = cover_tilt_position
+        self._set_state("_cover_tilt_position", cover_tilt_position)
 
     @cover_position.setter
     def cover_position(self, cover_position):
-        self._cover_position = cover_position
+        self._set_state("_cover_position", cover_position)
 
     @property
     def is_closed(self) -> bool:
@@ -182,7 +404,7 @@ class HomePilotCover(HomePilotDevice):
 
     @is_closed.setter
     def is_closed(self, is_closed):
-        self._is_closed = is_closed
+        self._set_state("_is_closed", is_closed)
 
     @property
     def is_closing(self) -> bool:
@@ -190,7 +412,7 @@ class HomePilotCover(HomePilotDevice):
 
     @is_closing.setter
     def is_closing(self, is_closing):
-        self._is_closing = is_closing
+        self._set_state("_is_closing", is_closing)
 
     @property
     def is_opening(self) -> bool:
@@ -198,39 +420,88 @@ class HomePilotCover(HomePilotDevice):
 
     @is_opening.setter
     def is_opening(self, is_opening):
-        self._is_opening = is_opening
+        self._set_state("_is_opening", is_opening)
 
     @property
     def can_set_position(self) -> bool:
-        return self._can_set_position
+        return self._profile.can_set_position
 
     @property
     def cover_type(self) -> int:
-        return self._cover_type
+        return self._profile.cover_type
 
     @property
     def has_tilt(self) -> bool:
-        return self._has_tilt
+        return self._profile.has_tilt
 
     @has_tilt.setter
     def has_tilt(self, has_tilt):
-        self._has_tilt = has_tilt
+        self._set_profile(self._profile._replace(has_tilt=has_tilt))
 
     @property
     def can_set_tilt_position(self) -> bool:
-        return self._can_set_tilt_position
+        return self._profile.can_set_tilt_position
 
     @can_set_tilt_position.setter
     def can_set_tilt_position(self, can_set_tilt_position):
-        self._can_set_tilt_position = can_set_tilt_position
+        self._set_profile(
+            self._profile._replace(can_set_tilt_position=can_set_tilt_position)
+        )
+
+    @property
+    def track_movement(self) -> bool:
+        return self._track_movement
+
+    @track_movement.setter
+    def track_movement(self, track_movement):
+        self._track_movement = track_movement
+
+    @property
+    def track_interval(self) -> float:
+        return self._track_interval
+
+    @track_interval.setter
+    def track_interval(self, track_interval):
+        self._track_interval = track_interval
+
+    @property
+    def predict_movement(self) -> bool:
+        return self._predict_movement
+
+    @predict_movement.setter
+    def predict_movement(self, predict_movement):
+        self._predict_movement = predict_movement
+
+    @property
+    def travel_model(self) -> CoverTravelModel:
+        return self._travel_model
+
+    @property
+    def is_tracking_movement(self) -> bool:
+        return self._tracking_task is not None
+
+    @property
+    def revision(self) -> int | None:
+        if self.predict_movement and self._travel_model.moving:
+            # the predicted position changes with time
+            return None
+        return self._revision
+
+    @property
+    def has_config(self) -> bool:
+        return self.has_ventilation_position_config
 
     @property
     def has_ventilation_position_config(self) -> bool:
-        return self._has_ventilation_position_config
+        return self._profile.has_ventilation_position_config
 
     @has_ventilation_position_config.setter
     def has_ventilation_position_config(self, has_ventilation_position_config):
-        self._has_ventilation_position_config = has_ventilation_position_config
+        self._set_profile(
+            self._profile._replace(
+                has_ventilation_position_config=has_ventilation_position_config
+            )
+        )
 
     @property
     def ventilation_position_mode(self) -> bool:
@@ -238,7 +509,7 @@ class HomePilotCover(HomePilotDevice):
 
     @ventilation_position_mode.setter
     def ventilation_position_mode(self, ventilation_position_mode):
-        self._ventilation_position_mode = ventilation_position_mode
+        self._set_state("_ventilation_position_mode", ventilation_position_mode)
 
     @property
     def ventilation_position(self) -> int:
@@ -246,4 +517,4 @@ class HomePilotCover(HomePilotDevice):
 
     @ventilation_position.setter
     def ventilation_position(self, ventilation_position):
-        self._ventilation_position = ventilation_position
+        self._set_state("_ventilation_position", ventilation_position)
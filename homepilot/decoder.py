@@ -0,0 +1,102 @@
+""" Table-driven decoding of the device states returned by HomePilot GW """
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+# default of a StateField that leaves the attribute unchanged
+NO_DEFAULT = object()
+
+
+class StateField(NamedTuple):
+    """A value of a device state: state[section][key] (or state[key] when section
+    is None), passed through transform and stored in the device attribute
+    (the private attribute behind the property, set without the setter). The
+    field is decoded only for devices whose flag property is true. A missing
+    key sets the attribute to default, if any."""
+
+    flag: str | None
+    section: str | None
+    key: str
+    attribute: str
+    transform: Callable[[Any], Any] | None = None
+    # raise KeyError when the key is missing
+    required: bool = False
+    default: Any = NO_DEFAULT
+
+
+class StateDecoder:
+    """Decoder of the fields of a state that a device actually has, grouped by
+    section"""
+
+    __slots__ = ("_sections",)
+
+    def __init__(self, fields: Iterable[StateField]) -> None:
+        sections: Dict[str | None, list] = {}
+        for field in fields:
+            sections.setdefault(field.section, []).append(
+                (field.key, field.attribute, field.transform, field.required, field.default)
+            )
+        self._sections = tuple(
+            (section, tuple(steps)) for section, steps in sections.items()
+        )
+
+    def decode(self, device, state) -> Tuple[List[str], bool]:
+        """Sets the attributes of the fields of state on device. Returns the
+        attributes of the fields present in state, and whether any attribute
+        changed value."""
+        decoded = []
+        changed = False
+        for section, steps in self._sections:
+            source = state if section is None else state[section]
+            for key, attribute, transform, required, default in steps:
+                if key in source:
+                    value = source[key]
+                    if transform is not None:
+                        value = transform(value)
+                    decoded.append(attribute)
+                elif required:
+                    raise KeyError(key)
+                elif default is not NO_DEFAULT:
+                    value = default
+                else:
+                    continue
+                if getattr(device, attribute, NO_DEFAULT) != value:
+                    setattr(device, attribute, value)
+                    changed = True
+        return decoded, changed
+
+    def __len__(self) -> int:
+        return sum(len(steps) for _, steps in self._sections)
+
+
+def tenths(value) -> float:
+    return value / 10
+
+
+def is_zero(value) -> bool:
+    return value == 0
+
+
+def is_not_zero(value) -> bool:
+    return value != 0
+
+
+def inverted_percent(value) -> int:
+    """HomePilot reports 0 for open covers, HA-style positions use 100"""
+    return 100 - value
+
+
+_decoders: Dict[Tuple[type, Tuple[bool, ...]], StateDecoder] = {}
+
+
+def get_state_decoder(device) -> StateDecoder:
+    """Returns the decoder of the state fields of the device's class enabled by
+    its flags, compiled once per class and combination of flags"""
+    fields = type(device)._state_fields
+    enabled = tuple(
+        field.flag is None or bool(getattr(device, field.flag)) for field in fields
+    )
+    key = (type(device), enabled)
+    if key not in _decoders:
+        _decoders[key] = StateDecoder(
+            field for field, is_enabled in zip(fields, enabled) if is_enabled
+        )
+    return _decoders[key]
@@ -1,27 +1,73 @@
+import asyncio
 """ This class represents a device in HomePilot GW """
+import time
+from array import array
+from typing import Any, Dict, Tuple
 
 from .api import HomePilotApi
+from .capabilities import CapabilityMap
+from .decoder import StateDecoder, StateField, get_state_decoder
+from .history import History, RollingStats, Stats
+from .profile import DeviceProfile, get_model, intern_profile
 
 from .const import (
     APICAP_DEVICE_TYPE_LOC,
     APICAP_ID_DEVICE_LOC,
+    APICAP_PING_CMD,
 )
 
+# Seconds an optimistic value is kept while the device does not report it
+OPTIMISTIC_TIMEOUT = 30
+# Seconds the last reported state is considered fresh to skip redundant commands
+STATE_MAX_AGE = 60
+# (field, window) rolling aggregates kept per device, the least recently
+# queried is dropped first
+STATS_WINDOWS_MAX = 16
+# value of a state attribute not set yet
+_UNSET = object()
+
 
 class HomePilotDevice:
     """HomePilot Device"""
 
+    __slots__ = (
+        "_api", "_did", "_uid", "_name", "_device_number", "_profile", "_fw_version",
+        "_device_group", "_available", "_config_stale", "_optimistic",
+        "_optimistic_timeout", "_pending", "_skip_redundant_commands", "_state_max_age",
+        "_state_updated_at", "_state_decoder", "_revision",
+        "_history", "_stats",
+    )
+
     _api: HomePilotApi
     _did: int
     _uid: str
     _name: str
     _device_number: str
-    _model: str
+    _profile: DeviceProfile
     _fw_version: str
     _device_group: int
     _manufacturer: str = "Rademacher"
-    _has_ping_cmd: bool
+    _devtype: str = None
+    # fields decoded from the state by update_state, see decoder.StateField
+    _state_fields: Tuple[StateField, ...] = ()
+    # (capability, field) pairs the profile derives from besides the presence of
+    # capabilities, part of the profile signature
+    _profile_capabilities: Tuple[Tuple[str, str], ...] = ()
+    # (field, flag, attribute) of the numeric values kept in the history
+    _history_fields: Tuple[Tuple[str, str, str], ...] = ()
     _available: bool
+    _config_stale: bool
+    _optimistic: bool
+    _optimistic_timeout: float
+    # attribute -> (optimistic value, last reported value, deadline)
+    _pending: Dict[str, Tuple[Any, Any, float]]
+    _skip_redundant_commands: bool
+    _state_max_age: float
+    _state_updated_at: float | None
+    _state_decoder: StateDecoder | None
+    _revision: int
+    _history: History | None
+    _stats: Dict[Tuple[str, float], Tuple[str, RollingStats]] | None
 
     def __init__(
         self,
@@ -40,35 +86,25 @@ class HomePilotDevice:
         self._uid = uid
         self._name = name
         self._device_number = device_number
-        self._model = model
+        self._profile = intern_profile(DeviceProfile(model, has_ping_cmd))
         self._fw_version = fw_version
         self._device_group = device_group
-        self._has_ping_cmd = has_ping_cmd
+        self._config_stale = False
+        self._optimistic = False
+        self._optimistic_timeout = OPTIMISTIC_TIMEOUT
+        self._pending = {}
+        self._skip_redundant_commands = False
+        self._state_max_age = STATE_MAX_AGE
+        self._state_updated_at = None
+        self._state_decoder = None
+        self._revision = 0
+        self._history = None
+        self._stats = None
 
     @staticmethod
-    def get_capabilities_map(device):
+    def get_capabilities_map(device) -> CapabilityMap:
         """Returns a map containing the capabilities of a device from a response of API"""
-        return {
-            capability["name"]: {
-                "value": capability["value"] if "value" in capability else None,
-                "read_only": capability["read_only"]
-                if "read_only" in capability
-                else None,
-                "timestamp": capability["timestamp"]
-                if "timestamp" in capability
-                else None,
-                "min_value": capability["min_value"]
-                if "min_value" in capability
-                else None,
-                "max_value": capability["max_value"]
-                if "max_value" in capability
-                else None,
-                "step_size": capability["step_size"]
-                if "step_size" in capability
-                else None,
-            }
-            for capability in device["capabilities"]
-        }
+        return CapabilityMap(device)
 
     @staticmethod
     def get_did_type_from_json(device):
@@ -78,12 +114,152 @@ class HomePilotDevice:
             "type": device_map[APICAP_DEVICE_TYPE_LOC]["value"],
         }
 
+    @staticmethod
+    def derive_profile(device_map) -> DeviceProfile:
+        """Derives the capability profile of a device, see profile.get_profile"""
+        return DeviceProfile(
+            model=get_model(device_map),
+            has_ping_cmd=APICAP_PING_CMD in device_map,
+        )
+
     async def update_state(self, state, api):
         self.available = state["statusValid"]
+        self._state_updated_at = time.monotonic()
+        decoded, changed = self.state_decoder.decode(self, state)
+        if changed:
+            # the decoder sets the private attributes, without the setters
+            self._revision += 1
+        # values of an invalid state, or left from a previous one, are not readings
+        if self.available and (self._history is not None or self._stats is not None):
+            now = time.time()
+            if self._history is not None:
+                self._history.record(self, now, decoded)
+            for attribute, rolling in (self._stats or {}).values():
+                value = getattr(self, attribute, None)
+                if value is not None and attribute in decoded:
+                    rolling.add(now, value)
+
+    def history(
+        self, field: str, start: float | None = None, end: float | None = None
+    ) -> Tuple[array, array]:
+        """Returns the timestamps (time.time()) and values of field recorded
+        from start to end, oldest first. Values are only recorded while
+        history_size is set."""
+        self._history_attribute(field)
+        if self._history is None or field not in self._history:
+            return array("d"), array("d")
+        return self._history[field].between(start, end)
+
+    def track_stats(self, field: str, window: float = 600) -> None:
+        """Starts keeping the aggregates of field over window seconds up to
+        date, so that the first stats() query already covers the readings
+        received since"""
+        self._rolling_stats(field, window, time.time())
+
+    def stats(self, field: str, window: float = 600) -> Stats:
+        """Returns the min, max, mean, EWMA and rate of change of field over the
+        last window seconds. The aggregates of a window are kept up to date
+        from its first query or track_stats() on, starting from the history
+        if any, for the STATS_WINDOWS_MAX most recently used windows. A new
+        window without history has a count of 0 and None aggregates."""
+        now = time.time()
+        return self._rolling_stats(field, window, now).stats(now)
+
+    def _rolling_stats(self, field: str, window: float, now: float) -> RollingStats:
+        key = (field, window)
+        if self._stats is None:
+            self._stats = {}
+        if key in self._stats:
+            # moved to the end, the most recently used
+            entry = self._stats.pop(key)
+        else:
+            attribute = self._history_attribute(field)
+            if len(self._stats) >= STATS_WINDOWS_MAX:
+                del self._stats[next(iter(self._stats))]
+            rolling = RollingStats(window)
+            for timestamp, value in zip(*self.history(field, start=now - window)):
+                rolling.add(timestamp, value)
+            entry = (attribute, rolling)
+        self._stats[key] = entry
+        return entry[1]
+
+    def _history_attribute(self, field: str) -> str:
+        for name, _, attribute in self._history_fields:
+            if name == field:
+                return attribute
+        raise KeyError(field)
+
+    def set_optimistic_value(self, attribute: str, value) -> None:
+        """Applies the expected result of a command immediately, if optimistic
+        mode is enabled, and keeps it pending until the device reports it or
+        optimistic_timeout expires"""
+        if self.optimistic:
+            reported = getattr(self, attribute, None)
+            if attribute in self._pending:
+                # the value before the previous command, not its optimistic one
+                reported = self._pending[attribute][1]
+            deadline = time.monotonic() + self.optimistic_timeout
+            setattr(self, attribute, value)
+            self._pending[attribute] = (value, reported, deadline)
+            asyncio.get_running_loop().call_later(
+                self.optimistic_timeout, self._expire_pending, attribute, deadline
+            )
+
+    def reconcile_pending(self) -> None:
+        """Confirms pending values reported by the device, keeps the others until
+        they time out and then leaves the reported value in place"""
+        now = time.monotonic()
+        for attribute, (value, _, deadline) in list(self._pending.items()):
+            reported = getattr(self, attribute)
+            if reported == value or now >= deadline:
+                del self._pending[attribute]
+            else:
+                self._pending[attribute] = (value, reported, deadline)
+                setattr(self, attribute, value)
+
+    def _expire_pending(self, attribute: str, deadline: float) -> None:
+        """Rolls a pending value that timed out back to the last reported one"""
+        pending = self._pending.get(attribute)
+        if pending is not None and pending[2] == deadline:
+            del self._pending[attribute]
+            setattr(self, attribute, pending[1])
+
+    def is_pending(self, attribute: str) -> bool:
+        return attribute in self._pending
+
+    def is_redundant_command(self, attribute: str, value, force: bool = False) -> bool:
+        """Returns True if redundant commands are skipped and the fresh state
+        last reported by the device already has the target value. Commands
+        are never skipped while a previous one is pending."""
+        return (
+            not force
+            and self.skip_redundant_commands
+            and self._state_updated_at is not None
+            and time.monotonic() - self._state_updated_at <= self.state_max_age
+            and getattr(self, "available", False)
+            and attribute not in self._pending
+            and self._reported_value(attribute) == value
+        )
+
+    def _reported_value(self, attribute: str):
+        return getattr(self, attribute, None)
+
+    def update_config(self, device_map) -> bool:
+        """Updates configuration values from a capabilities map of the device,
+        returns False if the map does not contain them"""
+        return True
+
+    async def async_update_config(self):
+        if self.has_config:
+            self.update_config(
+                HomePilotDevice.get_capabilities_map(await self.api.get_device(self.did))
+            )
+            self.config_stale = False
 
     async def async_ping(self):
         if self.has_ping_cmd:
-            await self.api.async_ping(self.did)
+            return await self.api.async_ping(self.did)
+        return None
 
     @property
     def api(self) -> HomePilotApi:
@@ -105,9 +281,28 @@ class HomePilotDevice:
     def device_number(self):
         return self._device_number
 
+    @property
+    def profile(self) -> DeviceProfile:
+        return self._profile
+
+    def _set_state(self, attribute: str, value) -> None:
+        """Sets the private attribute behind a state property, bumping the
+        revision if its value changes"""
+        if getattr(self, attribute, _UNSET) != value:
+            setattr(self, attribute, value)
+            self._revision += 1
+
+    def _set_profile(self, profile) -> None:
+        """Replaces the profile of the device, which the manager indexes
+        notice by its identity"""
+        profile = intern_profile(profile)
+        if profile is not self._profile:
+            self._profile = profile
+            self._revision += 1
+
     @property
     def model(self):
-        return self._model
+        return self._profile.model
 
     @property
     def fw_version(self):
@@ -117,13 +312,85 @@ class HomePilotDevice:
     def device_group(self):
         return self._device_group
 
+    @property
+    def devtype(self) -> str:
+        return self._devtype
+
+    @property
+    def state_decoder(self) -> StateDecoder:
+        if self._state_decoder is None:
+            self._state_decoder = get_state_decoder(self)
+        return self._state_decoder
+
     @property
     def manufacturer(self):
         return self._manufacturer
 
     @property
     def has_ping_cmd(self):
-        return self._has_ping_cmd
+        return self._profile.has_ping_cmd
+
+    @property
+    def has_config(self) -> bool:
+        return False
+
+    @property
+    def optimistic(self) -> bool:
+        return self._optimistic
+
+    @optimistic.setter
+    def optimistic(self, optimistic):
+        self._optimistic = optimistic
+        if not optimistic:
+            self._pending.clear()
+
+    @property
+    def optimistic_timeout(self) -> float:
+        return self._optimistic_timeout
+
+    @optimistic_timeout.setter
+    def optimistic_timeout(self, optimistic_timeout):
+        self._optimistic_timeout = optimistic_timeout
+
+    @property
+    def skip_redundant_commands(self) -> bool:
+        return self._skip_redundant_commands
+
+    @skip_redundant_commands.setter
+    def skip_redundant_commands(self, skip_redundant_commands):
+        self._skip_redundant_commands = skip_redundant_commands
+
+    @property
+    def state_max_age(self) -> float:
+        return self._state_max_age
+
+    @state_max_age.setter
+    def state_max_age(self, state_max_age):
+        self._state_max_age = state_max_age
+
+    @property
+    def history_size(self) -> int:
+        """Number of values kept per history field, 0 to keep none"""
+        return 0 if self._history is None else self._history.size
+
+    @history_size.setter
+    def history_size(self, history_size: int):
+        self._history = History(
+            history_size,
+            (
+                (field, attribute)
+                for field, flag, attribute in self._history_fields
+                if getattr(self, flag)
+            ),
+        ) if history_size else None
+
+    @property
+    def config_stale(self) -> bool:
+        return self._config_stale
+
+    @config_stale.setter
+    def config_stale(self, config_stale):
+        self._config_stale = config_stale
 
     @property
     def available(self) -> bool:
@@ -131,7 +398,13 @@ class HomePilotDevice:
 
     @available.setter
     def available(self, available):
-        self._available = available
+        self._set_state("_available", available)
+
+    @property
+    def revision(self) -> int | None:
+        """Counter increased on every state update of the device, None while its
+        state changes continuously"""
+        return self._revision
 
     @property
     def extra_attributes(self):
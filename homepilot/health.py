@@ -0,0 +1,85 @@
+""" Availability tracking of the devices in HomePilot GW """
+
+# Seconds until the first probe of an unavailable device, doubled on every
+# failed probe up to BACKOFF_MAX
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# Seconds over which the ping service spreads one ping of every device
+PING_INTERVAL = 300
+
+
+class DeviceHealth:
+    """Availability of a device, with exponential backoff of the probes sent
+    while it is unavailable"""
+
+    _failures: int
+    _next_probe_at: float | None
+    _ping_latency: float | None
+    _ping_failures: int
+    _last_ping_at: float | None
+
+    def __init__(self) -> None:
+        self._failures = 0
+        self._next_probe_at = None
+        self._ping_latency = None
+        self._ping_failures = 0
+        self._last_ping_at = None
+
+    def record_state(self, available: bool, now: float) -> None:
+        if available:
+            self._failures = 0
+            self._next_probe_at = None
+        elif self._failures == 0:
+            self._failures = 1
+            self._schedule_probe(now)
+
+    def record_probe(self, success: bool, now: float) -> None:
+        """Schedules the next probe, backing off further if this one failed. A
+        device only leaves the backoff when its state is valid again."""
+        if not success:
+            self._failures += 1
+        self._schedule_probe(now)
+
+    def record_ping(self, success: bool, latency: float, now: float) -> None:
+        """A failed ping backs the device off until its state is valid again"""
+        self._last_ping_at = now
+        if success:
+            self._ping_latency = latency
+            self._ping_failures = 0
+        else:
+            self._ping_failures += 1
+            if self._failures == 0:
+                self._failures = 1
+                self._schedule_probe(now)
+
+    def probe_due(self, now: float) -> bool:
+        return self.backed_off and now >= self._next_probe_at
+
+    def _schedule_probe(self, now: float) -> None:
+        self._next_probe_at = now + min(
+            BACKOFF_BASE * 2 ** (self._failures - 1), BACKOFF_MAX
+        )
+
+    @property
+    def backed_off(self) -> bool:
+        return self._failures > 0
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    @property
+    def next_probe_at(self) -> float | None:
+        return self._next_probe_at
+
+    @property
+    def ping_latency(self) -> float | None:
+        return self._ping_latency
+
+    @property
+    def ping_failures(self) -> int:
+        return self._ping_failures
+
+    @property
+    def last_ping_at(self) -> float | None:
+        return self._last_ping_at
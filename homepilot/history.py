@@ -0,0 +1,191 @@
+""" Bounded in-memory history of the values reported by devices """
+import math
+from array import array
+from collections import deque
+from typing import Container, Deque, Dict, Iterable, NamedTuple, Tuple
+
+
+class RingBuffer:
+    """Last size (timestamp, value) pairs, in two float64 arrays allocated
+    once. Timestamps are kept in non-decreasing order."""
+
+    __slots__ = ("_timestamps", "_values", "_start", "_count")
+
+    def __init__(self, size: int) -> None:
+        self._timestamps = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        self._start = 0
+        self._count = 0
+
+    def append(self, timestamp: float, value: float) -> None:
+        """Appends a pair, its timestamp raised to the previous one if the
+        clock went back, so that between() can bisect"""
+        size = len(self._timestamps)
+        if self._count:
+            timestamp = max(timestamp, self._timestamp(self._count - 1))
+        if self._count < size:
+            position = (self._start + self._count) % size
+            self._count += 1
+        else:
+            position = self._start
+            self._start = (self._start + 1) % size
+        self._timestamps[position] = timestamp
+        self._values[position] = value
+
+    def _timestamp(self, index: int) -> float:
+        return self._timestamps[(self._start + index) % len(self._timestamps)]
+
+    def _bisect(self, timestamp: float, right: bool) -> int:
+        """Returns the index of the first entry after timestamp, or at or after
+        timestamp when not right"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            value = self._timestamp(middle)
+            if value < timestamp or (right and value == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def between(
+        self, start: float | None = None, end: float | None = None
+    ) -> Tuple[array, array]:
+        """Returns copies of the timestamps and values from start to end
+        included, oldest first"""
+        low = 0 if start is None else self._bisect(start, False)
+        high = self._count if end is None else self._bisect(end, True)
+        if high <= low:
+            return array("d"), array("d")
+        size = len(self._timestamps)
+        first = (self._start + low) % size
+        last = first + high - low
+        if last <= size:
+            return self._timestamps[first:last], self._values[first:last]
+        return (
+            self._timestamps[first:] + self._timestamps[:last - size],
+            self._values[first:] + self._values[:last - size],
+        )
+
+    def latest(self) -> Tuple[float, float] | None:
+        if not self._count:
+            return None
+        position = (self._start + self._count - 1) % len(self._timestamps)
+        return self._timestamps[position], self._values[position]
+
+    @property
+    def size(self) -> int:
+        return len(self._timestamps)
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class History:
+    """Ring buffers of the numeric values of one device, per field"""
+
+    __slots__ = ("_size", "_fields", "_buffers")
+
+    def __init__(self, size: int, fields: Iterable[Tuple[str, str]]) -> None:
+        self._size = size
+        # (field, attribute) pairs
+        self._fields = tuple(fields)
+        self._buffers: Dict[str, RingBuffer] = {
+            field: RingBuffer(size) for field, _ in self._fields
+        }
+
+    def record(self, device, timestamp: float, attributes: Container[str]) -> None:
+        """Appends the values of the fields whose attribute was just decoded"""
+        for field, attribute in self._fields:
+            if attribute in attributes:
+                value = getattr(device, attribute, None)
+                if value is not None:
+                    self._buffers[field].append(timestamp, value)
+
+    def __getitem__(self, field) -> RingBuffer:
+        return self._buffers[field]
+
+    def __contains__(self, field) -> bool:
+        return field in self._buffers
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+
+class Stats(NamedTuple):
+    """Aggregates of the values of a window, None without values (ewma keeps
+    its last value). rate is the change per second between the oldest and the
+    newest value."""
+
+    count: int
+    min: float | None
+    max: float | None
+    mean: float | None
+    ewma: float | None
+    rate: float | None
+
+
+class RollingStats:
+    """Aggregates of the values of the last window seconds, updated in
+    amortized O(1) per value: a running sum, monotonic deques for min and max,
+    and an EWMA with window as time constant"""
+
+    __slots__ = ("_window", "_values", "_sum", "_min", "_max", "_ewma", "_ewma_at")
+
+    def __init__(self, window: float) -> None:
+        self._window = window
+        self._values: Deque[Tuple[float, float]] = deque()
+        self._sum = 0.0
+        # candidates for the min and max of the window, oldest first
+        self._min: Deque[Tuple[float, float]] = deque()
+        self._max: Deque[Tuple[float, float]] = deque()
+        self._ewma = None
+        self._ewma_at = None
+
+    def add(self, timestamp: float, value: float) -> None:
+        self._values.append((timestamp, value))
+        self._sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((timestamp, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((timestamp, value))
+        if self._ewma is None:
+            self._ewma = value
+        else:
+            weight = 1 - math.exp(-max(0.0, timestamp - self._ewma_at) / self._window)
+            self._ewma += weight * (value - self._ewma)
+        self._ewma_at = timestamp
+        self._expire(timestamp)
+
+    def _expire(self, now: float) -> None:
+        oldest = now - self._window
+        while self._values and self._values[0][0] <= oldest:
+            self._sum -= self._values.popleft()[1]
+        if not self._values:
+            # drop the rounding errors accumulated by the running sum
+            self._sum = 0.0
+        while self._min and self._min[0][0] <= oldest:
+            self._min.popleft()
+        while self._max and self._max[0][0] <= oldest:
+            self._max.popleft()
+
+    def stats(self, now: float) -> Stats:
+        self._expire(now)
+        if not self._values:
+            return Stats(0, None, None, None, self._ewma, None)
+        (first_at, first), (last_at, last) = self._values[0], self._values[-1]
+        return Stats(
+            count=len(self._values),
+            min=self._min[0][1],
+            max=self._max[0][1],
+            mean=self._sum / len(self._values),
+            ewma=self._ewma,
+            rate=(last - first) / (last_at - first_at) if last_at > first_at else None,
+        )
+
+    @property
+    def window(self) -> float:
+        return self._window
@@ -1,5 +1,9 @@
 import asyncio
 import logging
+from typing import AsyncIterator, NamedTuple
+
+from aiohttp import ClientError
+
 from .api import HomePilotApi
 from .const import (
     APICAP_DEVICE_TYPE_LOC,
@@ -10,8 +14,25 @@ from .device import HomePilotDevice
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds between firmware status polls while an update is downloading/idle
+FW_STATUS_FAST_INTERVAL = 1
+FW_STATUS_SLOW_INTERVAL = 10
+
+
+class FirmwareUpdateProgress(NamedTuple):
+    update_status: str
+    download_progress: int | bool
+    rebooting: bool = False
+
 
 class HomePilotHub(HomePilotDevice):
+    __slots__ = (
+        "_nodename", "_hub_type", "_hw_platform", "_sw_platform",
+        "_duofern_stick_version", "_fw_update_available", "_fw_update_version",
+        "_download_progress", "_auto_update", "_release_notes", "_led_status",
+        "_mac_address",
+    )
+
     _nodename: str
     _hub_type: str
     _hw_platform: str
@@ -24,6 +45,7 @@ class HomePilotHub(HomePilotDevice):
     _auto_update: bool
     _release_notes: str
     _led_status: bool
+    _mac_address: str
 
     def __init__(
         self,
@@ -39,6 +61,7 @@ class HomePilotHub(HomePilotDevice):
         nodename,
         hw_platform,
         sw_platform,
+        mac_address=None,
     ) -> None:
         super().__init__(
             api=api,
@@ -56,6 +79,7 @@ class HomePilotHub(HomePilotDevice):
         self._hub_type = "Start2Smart" if hw_platform else "ampere"
         self._hw_platform = hw_platform
         self._sw_platform = sw_platform
+        self._mac_address = mac_address
 
     @staticmethod
     def build_from_api(api: HomePilotApi, did: str):
@@ -71,9 +95,12 @@ class HomePilotHub(HomePilotDevice):
 
     @staticmethod
     async def async_build_from_api(api: HomePilotApi, did):
-        fw_version = await api.async_get_fw_version()
-        mac_address = await HomePilotHub.get_hub_macaddress(api)
-        nodename: str = (await api.async_get_nodename())["nodename"]
+        fw_version, mac_address, nodename = await asyncio.gather(
+            api.async_get_fw_version(),
+            HomePilotHub.get_hub_macaddress(api),
+            api.async_get_nodename(),
+        )
+        nodename: str = nodename["nodename"]
         capabilities_map = HomePilotDevice.get_capabilities_map(
             HomePilotHub.get_capabilities()
         )
@@ -92,6 +119,7 @@ class HomePilotHub(HomePilotDevice):
             nodename=nodename,
             hw_platform=fw_version["hw_platform"],
             sw_platform=fw_version["sw_platform"],
+            mac_address=mac_address,
         )
 
     @staticmethod
@@ -106,31 +134,69 @@ class HomePilotHub(HomePilotDevice):
 
     async def update_state(self, state, api):
         self.available = True
-        self.fw_update_available = (
-            state["status"]["update_status"] != "NO_UPDATE_AVAILABLE"
-        )
-        self.fw_version = state["status"]["version"]
+        self.update_fw_status(state["status"])
+        self.led_status = state["led"]["status"] == "enabled"
+
+    def update_fw_status(self, status) -> None:
+        self.fw_update_available = status["update_status"] != "NO_UPDATE_AVAILABLE"
+        self.fw_version = status["version"]
         self.fw_update_version = (
-            state["status"]["new_version"]
-            if "new_version" in state["status"] and self.fw_update_available
-            else state["status"]["version"]
+            status["new_version"]
+            if "new_version" in status and self.fw_update_available
+            else status["version"]
         )
         self.release_notes = (
-            state["status"]["release_notes"]
-            if "release_notes" in state["status"] and self.fw_update_available
+            status["release_notes"]
+            if "release_notes" in status and self.fw_update_available
             else ""
         )
         self.download_progress = (
-            state["status"]["download_progress"]
-            if "download_progress" in state["status"]
-            else False
+            status["download_progress"] if "download_progress" in status else False
         )
         self.auto_update = (
-            state["status"]["auto_update"]
-            if "auto_update" in state["status"]
-            else False
+            status["auto_update"] if "auto_update" in status else False
         )
-        self.led_status = state["led"]["status"] == "enabled"
+
+    async def async_watch_fw_update(
+        self,
+        fast_interval: float = FW_STATUS_FAST_INTERVAL,
+        slow_interval: float = FW_STATUS_SLOW_INTERVAL,
+    ) -> AsyncIterator[FirmwareUpdateProgress]:
+        """Yields the firmware update progress whenever it changes, polling
+        only the update status: every fast_interval seconds while downloading,
+        every slow_interval seconds otherwise. Ends once no update is pending
+        anymore, or after yielding a rebooting progress when the hub stops
+        answering."""
+        last = None
+        while True:
+            try:
+                status = await self.api.async_get_fw_status()
+            except (ClientError, asyncio.TimeoutError):
+                try:
+                    connection = await self.api.test_connection(self.api.host)
+                except (ClientError, asyncio.TimeoutError):
+                    connection = "error"
+                if connection != "error":
+                    raise
+                # the hub went down to install the update
+                yield FirmwareUpdateProgress(
+                    update_status=last.update_status if last else "",
+                    download_progress=last.download_progress if last else False,
+                    rebooting=True,
+                )
+                return
+            self.update_fw_status(status)
+            progress = FirmwareUpdateProgress(
+                update_status=status["update_status"],
+                download_progress=self.download_progress,
+            )
+            if progress != last:
+                yield progress
+                last = progress
+            if not self.fw_update_available:
+                return
+            downloading = self.download_progress is not False
+            await asyncio.sleep(fast_interval if downloading else slow_interval)
 
     async def async_ping(self):
         pass
@@ -160,12 +226,16 @@ class HomePilotHub(HomePilotDevice):
 
     @fw_version.setter
     def fw_version(self, fw_version):
-        self._fw_version = fw_version
+        self._set_state("_fw_version", fw_version)
 
     @property
     def nodename(self):
         return self._nodename
 
+    @property
+    def mac_address(self):
+        return self._mac_address
+
     @property
     def hw_platform(self):
         return self._hw_platform
@@ -184,7 +254,7 @@ class HomePilotHub(HomePilotDevice):
 
     @fw_update_available.setter
     def fw_update_available(self, fw_update_available):
-        self._fw_update_available = fw_update_available
+        self._set_state("_fw_update_available", fw_update_available)
 
     @property
     def release_notes(self):
@@ -192,7 +262,7 @@ class HomePilotHub(HomePilotDevice):
 
     @release_notes.setter
     def release_notes(self, release_notes):
-        self._release_notes = release_notes
+        self._set_state("_release_notes", release_notes)
 
     @property
     def download_progress(self):
@@ -200,7 +270,7 @@ class HomePilotHub(HomePilotDevice):
 
     @download_progress.setter
     def download_progress(self, download_progress):
-        self._download_progress = download_progress
+        self._set_state("_download_progress", download_progress)
 
     @property
     def auto_update(self):
@@ -208,7 +278,7 @@ class HomePilotHub(HomePilotDevice):
 
     @auto_update.setter
     def auto_update(self, auto_update):
-        self._auto_update = auto_update
+        self._set_state("_auto_update", auto_update)
 
     @property
     def fw_update_version(self):
@@ -216,7 +286,7 @@ class HomePilotHub(HomePilotDevice):
 
     @fw_update_version.setter
     def fw_update_version(self, fw_update_version):
-        self._fw_update_version = fw_update_version
+        self._set_state("_fw_update_version", fw_update_version)
 
     @property
     def led_status(self):
@@ -224,7 +294,7 @@ class HomePilotHub(HomePilotDevice):
 
     @led_status.setter
     def led_status(self, led_status):
-        self._led_status = led_status
+        self._set_state("_led_status", led_status)
 
     @property
     def extra_attributes(self):
@@ -1,6 +1,7 @@
 import asyncio
 import logging
-from typing import Dict
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
 
 from .hub import HomePilotHub
 from .sensor import HomePilotSensor
@@ -11,17 +12,57 @@ from .actuator import HomePilotActuator
 from .api import HomePilotApi, AuthError
 from .wallcontroller import HomePilotWallController
 
+from .const import APICAP_ID_DEVICE_LOC
 from .device import HomePilotDevice
+from .health import PING_INTERVAL, DeviceHealth
+from .scheduler import timed_requests
+from .snapshot import FleetSnapshot, SnapshotTable
 
 _LOGGER = logging.getLogger(__name__)
 
+# Identity attributes indexed eagerly; has_* capability flags are indexed on
+# their first query
+INDEXED_ATTRIBUTES = ("uid", "name", "device_number", "model")
+# Seconds before the configuration of a device missing from the /devices
+# listing is requested on its own again
+CONFIG_FALLBACK_INTERVAL = 300
+# Seconds between two /devices listings refreshing the device configurations,
+# unless a command marked one of them stale
+CONFIG_REFRESH_INTERVAL = 3600
+# Seconds between two /devices listings polled for wall controller key presses
+KEY_PRESS_INTERVAL = 2
+
 
 class HomePilotManager:
     _api: HomePilotApi
     _devices: Dict[str, HomePilotDevice]
+    _config_refresh_interval: float
+    _config_refreshed_at: float | None
+    _health: Dict[str, DeviceHealth]
+    # did -> (time of the next per-device config request, whether the last failed)
+    _config_fallback_at: Dict[str, Tuple[float, bool]]
+    _indexes: Dict[str, Dict[Any, Set[str]]]
+    _class_index: Dict[type, Set[str]]
+    # did -> (device, profile) as indexed, to notice devices replaced in the
+    # devices dict or whose flags changed since
+    _indexed: Dict[str, Tuple[HomePilotDevice, Any]]
+    _snapshot_table: SnapshotTable
+    _listeners: List[Callable[[FleetSnapshot], None]]
+    _probe_task: asyncio.Task | None
 
-    def __init__(self, api: HomePilotApi) -> None:
+    def __init__(self, api: HomePilotApi, config_refresh_interval: float = CONFIG_REFRESH_INTERVAL) -> None:
         self._api = api
+        self._devices = {}
+        self._indexes = {attr: {} for attr in INDEXED_ATTRIBUTES}
+        self._class_index = {}
+        self._indexed = {}
+        self._config_refresh_interval = config_refresh_interval
+        self._config_refreshed_at = None
+        self._health = {}
+        self._config_fallback_at = {}
+        self._snapshot_table = SnapshotTable()
+        self._listeners = []
+        self._probe_task = None
 
     @staticmethod
     def build_manager(api: HomePilotApi):
@@ -57,21 +98,120 @@ class HomePilotManager:
             return await HomePilotWallController.async_build_from_api(api, id_type["did"])
         return None
 
+    def add_device(self, device: HomePilotDevice) -> None:
+        """Adds a discovered device, replacing any device with the same did"""
+        self.remove_device(device.did)
+        self._devices[device.did] = device
+        self._index_device(device)
+
+    def remove_device(self, did) -> HomePilotDevice | None:
+        device = self._devices.pop(did, None)
+        if device is not None:
+            self._unindex_device(device)
+        return device
+
+    def find(self, cls: type = None, **attributes) -> List[HomePilotDevice]:
+        """Returns the devices that are instances of cls and whose attributes have
+        the given values, e.g. find(cls=HomePilotCover, has_tilt=True), resolving
+        them through the indexes where possible"""
+        if self._indexes_stale():
+            self._reindex()
+        candidates = None
+        if cls is not None:
+            candidates = self._class_index.get(cls, set())
+        for attr, value in attributes.items():
+            index = self._get_index(attr)
+            if index is None:
+                continue
+            try:
+                dids = index.get(value, set())
+            except TypeError:
+                # unhashable value, left to the verification below
+                continue
+            candidates = dids if candidates is None else candidates & dids
+        if candidates is None:
+            candidates = self._devices.keys()
+        return [
+            device for device in (self._devices[did] for did in candidates)
+            if (cls is None or isinstance(device, cls))
+            and all(
+                getattr(device, attr, None) == value
+                for attr, value in attributes.items()
+            )
+        ]
+
+    def _indexes_stale(self) -> bool:
+        if len(self._indexed) != len(self._devices):
+            return True
+        for did, device in self._devices.items():
+            indexed_device, indexed_profile = self._indexed.get(did, (None, None))
+            if indexed_device is not device or indexed_profile is not device._profile:
+                return True
+        return False
+
+    def _reindex(self) -> None:
+        self._indexes = {attr: {} for attr in INDEXED_ATTRIBUTES}
+        self._class_index = {}
+        self._indexed = {}
+        for device in self._devices.values():
+            self._index_device(device)
+
+    def _get_index(self, attr) -> Dict[Any, Set[str]] | None:
+        if attr not in self._indexes and attr.startswith("has_"):
+            self._indexes[attr] = {}
+            for device in self._devices.values():
+                self._index_value(attr, device)
+        return self._indexes.get(attr)
+
+    def _index_value(self, attr, device: HomePilotDevice) -> None:
+        try:
+            self._indexes[attr].setdefault(getattr(device, attr, None), set()).add(
+                device.did
+            )
+        except TypeError:
+            pass
+
+    def _index_device(self, device: HomePilotDevice) -> None:
+        for attr in self._indexes:
+            self._index_value(attr, device)
+        for cls in type(device).__mro__:
+            if issubclass(cls, HomePilotDevice):
+                self._class_index.setdefault(cls, set()).add(device.did)
+        self._indexed[device.did] = (device, device._profile)
+
+    def _unindex_device(self, device: HomePilotDevice) -> None:
+        for index in self._indexes.values():
+            for dids in index.values():
+                dids.discard(device.did)
+        for dids in self._class_index.values():
+            dids.discard(device.did)
+        self._indexed.pop(device.did, None)
+
+    @property
+    def hub(self) -> HomePilotHub | None:
+        hub = self.devices.get("-1")
+        return hub if isinstance(hub, HomePilotHub) else None
+
     async def get_hub_macaddress(self):
-        interfaces = await self.api.async_get_interfaces()
-        for k in interfaces["interfaces"]:
-            if interfaces["interfaces"][k]["enabled"]:
-                return interfaces["interfaces"][k]["address"]
-        return None
+        if self.hub is not None:
+            return self.hub.mac_address
+        return await HomePilotHub.get_hub_macaddress(self.api)
 
     async def get_nodename(self):
+        if self.hub is not None:
+            return self.hub.nodename
         return (await self.api.async_get_nodename())["nodename"]
 
     async def get_hub_state(self):
+        status, version, led = await asyncio.gather(
+            self.api.async_get_fw_status(),
+            self.api.async_get_fw_version(),
+            self.api.async_get_led_status(),
+        )
         return {
-            "status": await self.api.async_get_fw_status(),
-            "version": await self.api.async_get_fw_version(),
-            "led": await self.api.async_get_led_status(),
+            "status": status,
+            "version": version,
+            "led": led,
         }
 
     async def update_state(self, did):
@@ -88,27 +228,248 @@ class HomePilotManager:
         device.update_state(state)
         return device
 
-    async def update_states(self):
+    async def update_states(self, device_types=None):
+        """Updates the state of all devices, or only of the devices of the given
+        devtypes (DEVTYPE_ACTUATOR, DEVTYPE_SENSOR, DEVTYPE_TRANSMITTER)"""
+        devices = {
+            did: device for did, device in self.devices.items()
+            if device_types is None or device.devtype in device_types
+        }
         try:
-            states = await self.api.async_get_devices_state()
-            states["-1"] = await self.get_hub_state()
+            states = await self.api.async_get_devices_state(device_types)
+            if device_types is None:
+                states["-1"] = await self.get_hub_state()
         except AuthError:
             raise
         except Exception:
-            for did in self.devices:
-                device: HomePilotDevice = self.devices[did]
+            for did in devices:
+                device: HomePilotDevice = devices[did]
                 device.available = False
             raise
 
-        for did in self.devices:
-            device: HomePilotDevice = self.devices[did]
+        now = time.monotonic()
+        for did in devices:
+            device: HomePilotDevice = devices[did]
             if device.did in states:
                 await device.update_state(states[did], self.api)
             else:
                 device.available = False
+            self.health(did).record_state(device.available, now)
+
+        self.schedule_probes(devices)
+
+        if device_types is None and self.config_refresh_due():
+            await self.update_configs()
 
+        self.notify_listeners()
         return self.devices
 
+    def add_listener(self, listener: Callable[[FleetSnapshot], None]):
+        """Calls listener with a snapshot of all devices after every
+        update_states, returns the function that removes it. Listeners run in
+        the event loop and should not block."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def notify_listeners(self) -> None:
+        if not self._listeners:
+            return
+        snapshot = self.snapshot()
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot)
+            except Exception:
+                _LOGGER.warning("Error in update listener", exc_info=True)
+
+    def snapshot(self) -> FleetSnapshot:
+        """Returns a columnar view of the state of all devices, re-reading only
+        the devices updated since the previous snapshot"""
+        return self._snapshot_table.refresh(self.devices)
+
+    def health(self, did) -> DeviceHealth:
+        if did not in self._health:
+            self._health[did] = DeviceHealth()
+        return self._health[did]
+
+    def is_backed_off(self, did) -> bool:
+        """Returns True while the device is unavailable, in which case per-device
+        requests to it are skipped until it comes back"""
+        return did in self._health and self._health[did].backed_off
+
+    async def probe_unavailable_devices(self, devices=None):
+        """Pings the unavailable devices whose next probe is due, backing off
+        exponentially while they stay unavailable"""
+        now = time.monotonic()
+        probes = [
+            device for did, device in (devices or self.devices).items()
+            if device.has_ping_cmd and self.health(did).probe_due(now)
+        ]
+        if not probes:
+            return
+        results = await asyncio.gather(
+            *(self.async_ping_device(device) for device in probes)
+        )
+        now = time.monotonic()
+        for device, success in zip(probes, results):
+            self.health(device.did).record_probe(success, now)
+
+    def schedule_probes(self, devices=None) -> None:
+        """Probes the unavailable devices in a background task, so that slow
+        pings do not hold the poll. Does nothing while a previous probe runs."""
+        if self._probe_task is not None and not self._probe_task.done():
+            return
+        self._probe_task = asyncio.get_running_loop().create_task(
+            self._async_probe(devices)
+        )
+
+    async def _async_probe(self, devices) -> None:
+        try:
+            await self.probe_unavailable_devices(devices)
+        except Exception:
+            _LOGGER.warning("Error probing unavailable devices", exc_info=True)
+
+    async def async_ping_device(self, device: HomePilotDevice) -> bool:
+        """Pings a device behind interactive commands, recording the latency of
+        the request and failures in its health"""
+        started = time.monotonic()
+        try:
+            with timed_requests() as durations, self.api.bulk_commands():
+                response = await device.async_ping()
+            success = (
+                not isinstance(response, dict) or response.get("error_code", 0) == 0
+            )
+        except AuthError:
+            raise
+        except Exception:
+            success = False
+        finished = time.monotonic()
+        # APIs that do not time their requests include the wait for a slot
+        latency = durations[-1] if durations else finished - started
+        self.health(device.did).record_ping(success, latency, finished)
+        return success
+
+    async def async_ping_devices(self, interval: float = PING_INTERVAL):
+        """Pings every available device with PING_CMD once, one at a time and
+        spread evenly over interval seconds. Waits interval seconds when there
+        is none."""
+        devices = [
+            device for did, device in self.devices.items()
+            if device.has_ping_cmd and not self.is_backed_off(did)
+        ]
+        if not devices:
+            # nothing to ping, wait for the next round
+            await asyncio.sleep(interval)
+            return
+        for device in devices:
+            started = time.monotonic()
+            await self.async_ping_device(device)
+            spacing = interval / len(devices) - (time.monotonic() - started)
+            await asyncio.sleep(max(0, spacing))
+
+    async def async_run_ping_service(self, interval: float = PING_INTERVAL):
+        """Keeps pinging the fleet on a rolling schedule, until cancelled"""
+        while True:
+            await self.async_ping_devices(interval)
+
+    def config_refresh_due(self) -> bool:
+        return (
+            self._config_refreshed_at is None
+            or time.monotonic() - self._config_refreshed_at
+            >= self.config_refresh_interval
+            or any(
+                device.config_stale and not self.is_backed_off(did)
+                for did, device in self.devices.items()
+            )
+        )
+
+    async def update_configs(self):
+        """Refreshes the configuration values of all devices from one /devices listing,
+        falling back to a per-device request for devices missing from it"""
+        devices = [
+            device for did, device in self.devices.items()
+            if device.has_config and not self.is_backed_off(did)
+        ]
+        if not devices:
+            self._config_refreshed_at = time.monotonic()
+            return
+        try:
+            device_maps = await self.get_device_maps()
+        except AuthError:
+            raise
+        except Exception:
+            _LOGGER.warning("Error refreshing device configurations", exc_info=True)
+            return
+        now = self._config_refreshed_at = time.monotonic()
+        fallback = []
+        for device in devices:
+            if device.did in device_maps and device.update_config(device_maps[device.did]):
+                device.config_stale = False
+                continue
+            # the listing does not carry this device's configuration: request it
+            # on its own, at most every CONFIG_FALLBACK_INTERVAL unless a command
+            # changed it, and not before CONFIG_FALLBACK_INTERVAL after a failure
+            next_at, failed = self._config_fallback_at.get(device.did, (0, False))
+            if now >= next_at or (device.config_stale and not failed):
+                fallback.append(device)
+        results = await asyncio.gather(
+            *(device.async_update_config() for device in fallback),
+            return_exceptions=True,
+        )
+        for device, result in zip(fallback, results):
+            failed = isinstance(result, Exception)
+            self._config_fallback_at[device.did] = (now + CONFIG_FALLBACK_INTERVAL, failed)
+            if isinstance(result, AuthError):
+                raise result
+            if failed:
+                _LOGGER.warning(
+                    "Error refreshing the configuration of device %s", device.did,
+                    exc_info=result,
+                )
+
+    async def get_device_maps(self):
+        """Returns the capabilities maps of all devices from one /devices listing"""
+        return {
+            device_map[APICAP_ID_DEVICE_LOC]["value"]: device_map
+            for device_map in (
+                HomePilotDevice.get_capabilities_map(device)
+                for device in await self.api.get_devices()
+            )
+            if APICAP_ID_DEVICE_LOC in device_map
+        }
+
+    async def async_watch_key_presses(self, interval: float = KEY_PRESS_INTERVAL):
+        """Yields a KeyPressEvent for every key pushed on any wall controller,
+        polling a single /devices listing per interval for all of them. The
+        watcher keeps its own last seen pushes, so the channel_<n> states of
+        the controllers and other watchers are not affected."""
+        # did -> channel -> timestamp of the last push seen
+        seen: Dict[str, Dict[int, int]] = {}
+        while True:
+            controllers = [
+                device for did, device in self.devices.items()
+                if isinstance(device, HomePilotWallController)
+                and not self.is_backed_off(did)
+            ]
+            for controller in controllers:
+                if controller.did not in seen:
+                    seen[controller.did] = dict(controller.channels)
+            if controllers:
+                try:
+                    device_maps = await self.get_device_maps()
+                except AuthError:
+                    raise
+                except Exception:
+                    _LOGGER.warning("Error polling wall controllers", exc_info=True)
+                    device_maps = None
+                if device_maps is not None:
+                    for controller in controllers:
+                        if controller.did in device_maps:
+                            for event in controller.key_presses_from_map(
+                                device_maps[controller.did], seen[controller.did]
+                            ):
+                                yield event
+            await asyncio.sleep(interval)
+
     async def get_device_ids_types(self):
         devices = await self.api.get_devices()
         devices.append(HomePilotHub.get_capabilities())
@@ -118,6 +479,14 @@ class HomePilotManager:
     def api(self) -> HomePilotApi:
         return self._api
 
+    @property
+    def config_refresh_interval(self) -> float:
+        return self._config_refresh_interval
+
+    @config_refresh_interval.setter
+    def config_refresh_interval(self, config_refresh_interval: float):
+        self._config_refresh_interval = config_refresh_interval
+
     @property
     def devices(self) -> Dict[str, HomePilotDevice]:
         return self._devices
@@ -125,3 +494,4 @@ class HomePilotManager:
     @devices.setter
     def devices(self, devices: Dict[str, HomePilotDevice]):
         self._devices = devices
+        self._reindex()
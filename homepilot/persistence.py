@@ -0,0 +1,189 @@
+""" Persistence of the state history of devices in a local SQLite database """
+import logging
+import math
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Tuple
+
+from .snapshot import FleetSnapshot, changed_values
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds between the transactions of the writer thread
+FLUSH_INTERVAL = 5
+# Seconds between the runs of the retention and downsampling policies
+MAINTENANCE_INTERVAL = 3600
+# Snapshots queued for the writer thread before new ones are dropped
+QUEUE_SIZE = 1000
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS readings "
+    "(did TEXT NOT NULL, field TEXT NOT NULL, ts REAL NOT NULL, value REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS readings_did_field_ts ON readings (did, field, ts)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)",
+)
+
+
+class SQLiteSink:
+    """Writes the values of the snapshot fields that changed in each update
+    of a manager to a SQLite database, from a background thread. Readings
+    older than retention seconds are deleted, and those older than
+    downsample_after seconds are averaged over downsample_interval buckets."""
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = FLUSH_INTERVAL,
+        retention: float | None = None,
+        downsample_after: float | None = None,
+        downsample_interval: float = 300,
+        maintenance_interval: float = MAINTENANCE_INTERVAL,
+    ) -> None:
+        self._path = path
+        self._flush_interval = flush_interval
+        self._retention = retention
+        self._downsample_after = downsample_after
+        self._downsample_interval = downsample_interval
+        self._maintenance_interval = maintenance_interval
+        self._queue: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._previous: FleetSnapshot | None = None
+        self._maintained_at = 0.0
+        self._stopped = threading.Event()
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            connection.commit()
+        finally:
+            connection.close()
+        self._thread = threading.Thread(
+            target=self._run, name="homepilot-sqlite-sink", daemon=True
+        )
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._path)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def attach(self, manager):
+        """Subscribes to the updates of manager, returns the function that
+        unsubscribes"""
+        return manager.add_listener(self.write)
+
+    def write(self, snapshot: FleetSnapshot) -> None:
+        """Queues a snapshot for the writer thread, without blocking"""
+        try:
+            self._queue.put_nowait((time.time(), snapshot))
+        except queue.Full:
+            _LOGGER.warning("SQLite sink is falling behind, dropping a snapshot")
+
+    def close(self) -> None:
+        """Writes the queued snapshots and stops the writer thread"""
+        self._stopped.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def query(
+        self, did: str, field: str, start: float | None = None, end: float | None = None
+    ) -> List[Tuple[float, float]]:
+        """Returns the (timestamp, value) readings of a field of a device from
+        start to end included, oldest first"""
+        connection = self._connect()
+        try:
+            return connection.execute(
+                "SELECT ts, value FROM readings WHERE did = ? AND field = ? "
+                "AND ts >= ? AND ts <= ? ORDER BY ts",
+                (
+                    did,
+                    field,
+                    -math.inf if start is None else start,
+                    math.inf if end is None else end,
+                ),
+            ).fetchall()
+        finally:
+            connection.close()
+
+    def _run(self) -> None:
+        connection = self._connect()
+        try:
+            while True:
+                stopping = self._stopped.wait(self._flush_interval)
+                batch = []
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    if batch:
+                        with connection:
+                            connection.executemany(
+                                "INSERT INTO readings (did, field, ts, value) "
+                                "VALUES (?, ?, ?, ?)",
+                                [
+                                    row
+                                    for timestamp, snapshot in batch
+                                    for row in self._changes(timestamp, snapshot)
+                                ],
+                            )
+                    if time.time() - self._maintained_at >= self._maintenance_interval:
+                        self._maintain(connection)
+                except sqlite3.Error:
+                    _LOGGER.warning("Error writing device states", exc_info=True)
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def _changes(self, timestamp: float, snapshot: FleetSnapshot):
+        previous = self._previous
+        self._previous = snapshot
+        for did, field, value in changed_values(previous, snapshot):
+            yield did, field, timestamp, value
+
+    def _maintain(self, connection: sqlite3.Connection) -> None:
+        now = time.time()
+        self._maintained_at = now
+        with connection:
+            if self._retention is not None:
+                connection.execute(
+                    "DELETE FROM readings WHERE ts < ?", (now - self._retention,)
+                )
+            if self._downsample_after is not None:
+                self._downsample(connection, now)
+
+    def _downsample(self, connection: sqlite3.Connection, now: float) -> None:
+        """Replaces the readings between the previous run and
+        downsample_after seconds ago by their average per bucket"""
+        interval = self._downsample_interval
+        until = math.floor((now - self._downsample_after) / interval) * interval
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = 'downsampled_until'"
+        ).fetchone()
+        since = row[0] if row is not None else -math.inf
+        if until <= since:
+            return
+        averages = connection.execute(
+            "SELECT did, field, CAST(ts / ? AS INTEGER) * ?, AVG(value) FROM readings "
+            "WHERE ts >= ? AND ts < ? GROUP BY did, field, CAST(ts / ? AS INTEGER)",
+            (interval, interval, since, until, interval),
+        ).fetchall()
+        connection.execute(
+            "DELETE FROM readings WHERE ts >= ? AND ts < ?", (since, until)
+        )
+        connection.executemany(
+            "INSERT INTO readings (did, field, ts, value) VALUES (?, ?, ?, ?)", averages
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('downsampled_until', ?)",
+            (until,),
+        )
@@ -0,0 +1,45 @@
+""" Capability profiles shared by the devices of the same model """
+from typing import Dict, NamedTuple
+
+from .const import APICAP_PROD_CODE_DEVICE_LOC, SUPPORTED_DEVICES
+
+
+class DeviceProfile(NamedTuple):
+    """Attributes of a device derived from its capabilities. Profiles are
+    immutable and interned, identical devices share one instance."""
+
+    model: str
+    has_ping_cmd: bool
+
+
+_interned: Dict[tuple, tuple] = {}
+_derived: Dict[tuple, tuple] = {}
+
+
+def intern_profile(profile):
+    """Returns the shared profile equal to profile"""
+    return _interned.setdefault((type(profile), profile), profile)
+
+
+def get_model(device_map) -> str:
+    product_code = device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"]
+    if product_code in SUPPORTED_DEVICES:
+        return SUPPORTED_DEVICES[product_code]["name"]
+    return "Generic Device"
+
+
+def get_profile(device_class, device_map):
+    """Returns the profile of a device_class device with the capabilities of
+    device_map, derived only once per product code and capability signature"""
+    key = (
+        device_class,
+        device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"],
+        frozenset(device_map),
+        tuple(
+            device_map[name][field] if name in device_map else None
+            for name, field in device_class._profile_capabilities
+        ),
+    )
+    if key not in _derived:
+        _derived[key] = intern_profile(device_class.derive_profile(device_map))
+    return _derived[key]
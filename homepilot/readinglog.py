@@ -0,0 +1,191 @@
+""" Append-only binary log of device readings, written through mmap """
+import bisect
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Iterator, NamedTuple
+
+from .snapshot import SNAPSHOT_FIELDS, FleetSnapshot, changed_values
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# did, field id (index in SNAPSHOT_FIELDS), timestamp, value
+RECORD = struct.Struct("<iHxxdd")
+# magic, number of records
+HEADER = struct.Struct("<8sQ")
+MAGIC = b"HPRLOG01"
+FIELD_IDS = {field: field_id for field_id, field in enumerate(SNAPSHOT_FIELDS)}
+# Records the file grows by when full
+GROW_RECORDS = 65536
+# Seconds between two flushes of the mapped pages to disk
+FLUSH_INTERVAL = 5
+
+
+class Reading(NamedTuple):
+    did: int
+    field: str
+    timestamp: float
+    value: float
+
+
+class ReadingLogWriter:
+    """Appends readings as fixed 24 bytes records to a file, mapped in memory
+    and grown by GROW_RECORDS records at a time. The record count in the
+    header is updated on every flush, and the file is truncated to its records
+    when closed. Dids must be integers, as those of HomePilot devices."""
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL) -> None:
+        self._flush_interval = flush_interval
+        self._flushed_at = time.monotonic()
+        self._previous: FleetSnapshot | None = None
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        self._file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, self._count = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC:
+                self._file.close()
+                raise ValueError(f"{path} is not a reading log")
+        else:
+            self._count = 0
+        self._file.truncate(
+            HEADER.size + (self._count + GROW_RECORDS) * RECORD.size
+        )
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._timestamp = (
+            RECORD.unpack_from(self._map, HEADER.size + (self._count - 1) * RECORD.size)[2]
+            if self._count else -math.inf
+        )
+
+    def attach(self, manager):
+        """Subscribes to the updates of manager, returns the function that
+        unsubscribes"""
+        return manager.add_listener(self.write)
+
+    def write(self, snapshot: FleetSnapshot) -> None:
+        """Appends the values that changed since the previous snapshot"""
+        previous = self._previous
+        self._previous = snapshot
+        timestamp = time.time()
+        for did, field, value in changed_values(previous, snapshot):
+            self.append(int(did), FIELD_IDS[field], timestamp, value)
+        if time.monotonic() - self._flushed_at >= self._flush_interval:
+            self.flush()
+
+    def append(self, did: int, field_id: int, timestamp: float, value: float) -> None:
+        """Appends a record, its timestamp raised to the previous one if the
+        clock went back, so that the log stays sorted for the readers"""
+        timestamp = self._timestamp = max(timestamp, self._timestamp)
+        offset = HEADER.size + self._count * RECORD.size
+        if offset + RECORD.size > len(self._map):
+            self._grow()
+        RECORD.pack_into(self._map, offset, did, field_id, timestamp, value)
+        self._count += 1
+
+    def _grow(self) -> None:
+        self._map.close()
+        self._file.truncate(HEADER.size + (self._count + GROW_RECORDS) * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def flush(self) -> None:
+        HEADER.pack_into(self._map, 0, MAGIC, self._count)
+        self._map.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._map.close()
+        self._file.truncate(HEADER.size + self._count * RECORD.size)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class ReadingLogReader:
+    """Reads the records of a reading log flushed when it is opened, straight
+    from the mapped file"""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a reading log")
+        self._count = min(count, (len(self._map) - HEADER.size) // RECORD.size)
+        self._records = memoryview(self._map)[
+            HEADER.size:HEADER.size + self._count * RECORD.size
+        ]
+
+    def _timestamp(self, index: int) -> float:
+        return RECORD.unpack_from(self._records, index * RECORD.size)[2]
+
+    def readings(
+        self,
+        did: int | None = None,
+        field: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> Iterator[Reading]:
+        """Yields the readings of did and field from start to end included,
+        finding start by binary search as records are appended in time order.
+        Each record is unpacked on its own, so the reader can be closed before
+        the iteration ends; resuming it then raises ValueError."""
+        first = 0
+        if start is not None:
+            first = bisect.bisect_left(
+                range(self._count), start, key=self._timestamp
+            )
+        field_id = None if field is None else FIELD_IDS[field]
+        for index in range(first, self._count):
+            record_did, record_field, timestamp, value = RECORD.unpack_from(
+                self._records, index * RECORD.size
+            )
+            if end is not None and timestamp > end:
+                return
+            if (did is None or record_did == did) and (
+                field_id is None or record_field == field_id
+            ):
+                yield Reading(record_did, SNAPSHOT_FIELDS[record_field], timestamp, value)
+
+    def as_array(self):
+        """Returns the records as a NumPy structured array sharing the memory
+        of the file, None without NumPy. The array must be released before
+        closing the reader."""
+        if numpy is None:
+            return None
+        return numpy.frombuffer(
+            self._records,
+            dtype=numpy.dtype({
+                "names": ["did", "field", "timestamp", "value"],
+                "formats": ["<i4", "<u2", "<f8", "<f8"],
+                "offsets": [0, 4, 8, 16],
+                "itemsize": RECORD.size,
+            }),
+        )
+
+    def close(self) -> None:
+        if hasattr(self, "_records"):
+            self._records.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
@@ -0,0 +1,170 @@
+""" Scheduling of the requests sent to the HomePilot hub """
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import List
+
+
+class Priority(IntEnum):
+    """Lower values are served first"""
+
+    COMMAND = 0
+    BULK_COMMAND = 1
+    REFRESH = 2
+    POLL = 3
+
+
+command_priority: ContextVar[Priority] = ContextVar(
+    "command_priority", default=Priority.COMMAND
+)
+request_durations: ContextVar[List[float] | None] = ContextVar(
+    "request_durations", default=None
+)
+
+
+@contextmanager
+def bulk_commands():
+    """Sends the commands issued in this context (and in tasks created from it)
+    with bulk priority, behind interactive commands"""
+    token = command_priority.set(Priority.BULK_COMMAND)
+    try:
+        yield
+    finally:
+        command_priority.reset(token)
+
+
+@contextmanager
+def timed_requests():
+    """Yields a list the commands sent in this context append their duration
+    to, from the moment they leave the scheduler and the limiter"""
+    durations: List[float] = []
+    token = request_durations.set(durations)
+    try:
+        yield durations
+    finally:
+        request_durations.reset(token)
+
+
+class CommandScheduler:
+    """Paces the commands sent onto the shared DuoFern radio channel: up to
+    burst_size commands go out back to back, then one every frame_spacing
+    seconds. Waiting commands are released in priority order."""
+
+    _frame_spacing: float
+    _burst_size: int
+
+    def __init__(self, frame_spacing: float = 0, burst_size: int = 1) -> None:
+        self._frame_spacing = frame_spacing
+        self._burst_size = burst_size
+        self._tokens = float(burst_size)
+        self._refilled_at = time.monotonic()
+        self._queue = []
+        self._counter = itertools.count()
+        self._dispatcher = None
+
+    async def acquire(self, priority: Priority = Priority.COMMAND) -> None:
+        if self.frame_spacing <= 0:
+            return
+        self._refill()
+        if not self._queue and self._tokens >= 1:
+            self._tokens -= 1
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._counter), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+        await future
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst_size),
+            self._tokens + (now - self._refilled_at) / self.frame_spacing,
+        )
+        self._refilled_at = now
+
+    async def _dispatch(self) -> None:
+        while self._queue:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) * self.frame_spacing)
+                continue
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                # the waiting command was cancelled
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+    @property
+    def frame_spacing(self) -> float:
+        return self._frame_spacing
+
+    @property
+    def burst_size(self) -> int:
+        return self._burst_size
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+
+class RequestLimiter:
+    """Limits the number of requests in flight to the hub; when the limit is
+    reached, waiting requests get a slot in priority order"""
+
+    _max_concurrent: int | None
+
+    def __init__(self, max_concurrent: int | None = None) -> None:
+        self._max_concurrent = max_concurrent
+        self._active = 0
+        self._queue = []
+        self._counter = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority):
+        if self.max_concurrent is None:
+            yield
+            return
+        if self._active < self.max_concurrent and not self._queue:
+            self._active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (priority, next(self._counter), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # the slot was handed over just before the cancellation
+                    self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                # hand the slot over to the next waiting request
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @property
+    def max_concurrent(self) -> int | None:
+        return self._max_concurrent
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
@@ -1,5 +1,7 @@
 import asyncio
 from enum import Enum
+from typing import NamedTuple
+
 from .const import (
     APICAP_BATTERY_LVL_PCT_MEA,
     APICAP_CLOSE_CONTACT_MEA,
@@ -20,10 +22,12 @@ from .const import (
     APICAP_TEMP_TARGET_DEG_MEA,
     APICAP_VERSION_CFG,
     APICAP_WIND_SPEED_MS_MEA,
-    SUPPORTED_DEVICES,
+    DEVTYPE_SENSOR,
 )
 from .api import HomePilotApi
+from .decoder import StateField
 from .device import HomePilotDevice
+from .profile import get_model, get_profile, intern_profile
 
 
 class ContactState(Enum):
@@ -32,31 +36,80 @@ class ContactState(Enum):
     CLOSED = 0
 
 
+class SensorProfile(NamedTuple):
+    model: str
+    has_ping_cmd: bool
+    has_temperature: bool
+    has_target_temperature: bool
+    has_wind_speed: bool
+    has_brightness: bool
+    has_sun_height: bool
+    has_sun_direction: bool
+    has_rain_detection: bool
+    has_sun_detection: bool
+    has_contact_state: bool
+    has_battery_level: bool
+    has_motion_detection: bool
+    has_smoke_detection: bool
+
+
+def _contact_state(value) -> ContactState:
+    if value == "closed":
+        return ContactState.CLOSED
+    if value == "tilted":
+        return ContactState.TILTED
+    return ContactState.OPEN
+
+
 class HomePilotSensor(HomePilotDevice):
-    _has_temperature: bool
+    __slots__ = (
+        "_temperature_value", "_target_temperature_value", "_wind_speed_value",
+        "_brightness_value", "_sun_height_value", "_sun_direction_value",
+        "_rain_detection_value", "_sun_detection_value", "_contact_state_value",
+        "_battery_level_value", "_motion_detection_value", "_smoke_detection_value",
+    )
+
+    _devtype: str = DEVTYPE_SENSOR
+    _state_fields = (
+        StateField("has_temperature", "readings", "temperature_primary", "_temperature_value"),
+        StateField("has_target_temperature", "readings", "temperature_target",
+                   "_target_temperature_value"),
+        StateField("has_wind_speed", "readings", "wind_speed", "_wind_speed_value"),
+        StateField("has_brightness", "readings", "sun_brightness", "_brightness_value"),
+        StateField("has_sun_height", "readings", "sun_elevation", "_sun_height_value"),
+        StateField("has_sun_direction", "readings", "sun_direction", "_sun_direction_value"),
+        StateField("has_rain_detection", "readings", "rain_detected", "_rain_detection_value"),
+        StateField("has_sun_detection", "readings", "sun_detected", "_sun_detection_value"),
+        StateField("has_contact_state", "readings", "contact_state", "_contact_state_value",
+                   _contact_state),
+        StateField("has_battery_level", None, "batteryStatus", "_battery_level_value"),
+        StateField("has_motion_detection", "readings", "movement_detected",
+                   "_motion_detection_value"),
+        StateField("has_smoke_detection", "readings", "smoke_detected",
+                   "_smoke_detection_value"),
+    )
+    _history_fields = (
+        ("temperature", "has_temperature", "_temperature_value"),
+        ("target_temperature", "has_target_temperature", "_target_temperature_value"),
+        ("wind_speed", "has_wind_speed", "_wind_speed_value"),
+        ("brightness", "has_brightness", "_brightness_value"),
+        ("sun_height", "has_sun_height", "_sun_height_value"),
+        ("sun_direction", "has_sun_direction", "_sun_direction_value"),
+        ("battery_level", "has_battery_level", "_battery_level_value"),
+    )
     _temperature_value: float
-    _has_target_temperature: bool
     _target_temperature_value: float
-    _has_wind_speed: bool
     _wind_speed_value: float
-    _has_brightness: bool
     _brightness_value: float
-    _has_sun_height: bool
     _sun_height_value: float
-    _has_sun_direction: bool
     _sun_direction_value: float
-    _has_rain_detection: bool
     _rain_detection_value: bool
-    _has_sun_detection: bool
     _sun_detection_value: bool
-    _has_contact_state: bool
     _contact_state_value: ContactState
-    _has_battery_level: bool
     _battery_level_value: float
-    _has_motion_detection: bool
     _motion_detection_value: bool
-    _has_smoke_detection: bool
     _smoke_detection_value: bool
+    _profile: SensorProfile
 
     def __init__(
         self,
@@ -93,18 +146,22 @@ class HomePilotSensor(HomePilotDevice):
             device_group=device_group,
             has_ping_cmd=has_ping_cmd,
         )
-        self._has_temperature = has_temperature
-        self._has_target_temperature = has_target_temperature
-        self._has_wind_speed = has_wind_speed
-        self._has_brightness = has_brightness
-        self._has_sun_height = has_sun_height
-        self._has_sun_direction = has_sun_direction
-        self._has_rain_detection = has_rain_detection
-        self._has_sun_detection = has_sun_detection
-        self._has_contact_state = has_contact_state
-        self._has_battery_level = has_battery_level
-        self._has_motion_detection = has_motion_detection
-        self._has_smoke_detection = has_smoke_detection
+        self._profile = intern_profile(SensorProfile(
+            model,
+            has_ping_cmd,
+            has_temperature,
+            has_target_temperature,
+            has_wind_speed,
+            has_brightness,
+            has_sun_height,
+            has_sun_direction,
+            has_rain_detection,
+            has_sun_detection,
+            has_contact_state,
+            has_battery_level,
+            has_motion_detection,
+            has_smoke_detection,
+        ))
 
     @staticmethod
     def build_from_api(api: HomePilotApi, did: str):
@@ -121,14 +178,16 @@ class HomePilotSensor(HomePilotDevice):
             uid=device_map[APICAP_PROT_ID_DEVICE_LOC]["value"],
             name=device_map[APICAP_NAME_DEVICE_LOC]["value"],
             device_number=device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"],
-            model=SUPPORTED_DEVICES[device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"]][
-                "name"
-            ]
-            if device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"] in SUPPORTED_DEVICES
-            else "Generic Device",
             fw_version=device_map[APICAP_VERSION_CFG]["value"]
             if APICAP_VERSION_CFG in device_map else "",
             device_group=device_map[APICAP_DEVICE_TYPE_LOC]["value"],
+            **get_profile(HomePilotSensor, device_map)._asdict(),
+        )
+
+    @staticmethod
+    def derive_profile(device_map) -> SensorProfile:
+        return SensorProfile(
+            model=get_model(device_map),
             has_ping_cmd=APICAP_PING_CMD in device_map,
             has_temperature=APICAP_TEMP_CURR_DEG_MEA in device_map,
             has_target_temperature=APICAP_TEMP_TARGET_DEG_MEA in device_map,
@@ -144,88 +203,53 @@ class HomePilotSensor(HomePilotDevice):
             has_smoke_detection=APICAP_SMOKE_DETECTION_MEA in device_map,
         )
 
-    async def update_state(self, state, api):
-        await super().update_state(state, api)
-        if self.has_temperature and "temperature_primary" in state["readings"]:
-            self.temperature_value = state["readings"]["temperature_primary"]
-        if self.has_target_temperature and "temperature_target" in state["readings"]:
-            self.target_temperature_value = state["readings"]["temperature_target"]
-        if self.has_wind_speed and "wind_speed" in state["readings"]:
-            self.wind_speed_value = state["readings"]["wind_speed"]
-        if self.has_brightness and "sun_brightness" in state["readings"]:
-            self.brightness_value = state["readings"]["sun_brightness"]
-        if self.has_sun_height and "sun_elevation" in state["readings"]:
-            self.sun_height_value = state["readings"]["sun_elevation"]
-        if self.has_sun_direction and "sun_direction" in state["readings"]:
-            self.sun_direction_value = state["readings"]["sun_direction"]
-        if self.has_rain_detection and "rain_detected" in state["readings"]:
-            self.rain_detection_value = state["readings"]["rain_detected"]
-        if self.has_sun_detection and "sun_detected" in state["readings"]:
-            self.sun_detection_value = state["readings"]["sun_detected"]
-        if self.has_contact_state and "contact_state" in state["readings"]:
-            self.contact_state_value = (
-                ContactState.CLOSED
-                if state["readings"]["contact_state"] == "closed"
-                else (
-                    ContactState.TILTED
-                    if state["readings"]["contact_state"] == "tilted"
-                    else ContactState.OPEN
-                )
-            )
-        if self.has_battery_level and "batteryStatus" in state:
-            self.battery_level_value = state["batteryStatus"]
-        if self.has_motion_detection and "movement_detected" in state["readings"]:
-            self.motion_detection_value = state["readings"]["movement_detected"]
-        if self.has_smoke_detection and "smoke_detected" in state["readings"]:
-            self.smoke_detection_value = state["readings"]["smoke_detected"]
-
     @property
     def has_temperature(self) -> bool:
-        return self._has_temperature
+        return self._profile.has_temperature
 
     @property
     def has_target_temperature(self) -> bool:
-        return self._has_target_temperature
+        return self._profile.has_target_temperature
 
     @property
     def has_wind_speed(self) -> bool:
-        return self._has_wind_speed
+        return self._profile.has_wind_speed
 
     @property
     def has_brightness(self) -> bool:
-        return self._has_brightness
+        return self._profile.has_brightness
 
     @property
     def has_sun_height(self) -> bool:
-        return self._has_sun_height
+        return self._profile.has_sun_height
 
     @property
     def has_sun_direction(self) -> bool:
-        return self._has_sun_direction
+        return self._profile.has_sun_direction
 
     @property
     def has_rain_detection(self) -> bool:
-        return self._has_rain_detection
+        return self._profile.has_rain_detection
 
     @property
     def has_sun_detection(self) -> bool:
-        return self._has_sun_detection
+        return self._profile.has_sun_detection
 
     @property
     def has_contact_state(self) -> bool:
-        return self._has_contact_state
+        return self._profile.has_contact_state
 
     @property
     def has_battery_level(self) -> bool:
-        return self._has_battery_level
+        return self._profile.has_battery_level
 
     @property
     def has_motion_detection(self) -> bool:
-        return self._has_motion_detection
+        return self._profile.has_motion_detection
 
     @property
     def has_smoke_detection(self) -> bool:
-        return self._has_smoke_detection
+        return self._profile.has_smoke_detection
 
     @property
     def temperature_value(self) -> float:
@@ -233,7 +257,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @temperature_value.setter
     def temperature_value(self, temperature_value):
-        self._temperature_value = temperature_value
+        self._set_state("_temperature_value", temperature_value)
 
     @property
     def target_temperature_value(self) -> float:
@@ -241,7 +265,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @target_temperature_value.setter
     def target_temperature_value(self, target_temperature_value):
-        self._target_temperature_value = target_temperature_value
+        self._set_state("_target_temperature_value", target_temperature_value)
 
     @property
     def wind_speed_value(self) -> float:
@@ -249,7 +273,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @wind_speed_value.setter
     def wind_speed_value(self, wind_speed_value):
-        self._wind_speed_value = wind_speed_value
+        self._set_state("_wind_speed_value", wind_speed_value)
 
     @property
     def brightness_value(self) -> float:
@@ -257,7 +281,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @brightness_value.setter
     def brightness_value(self, brightness_value):
-        self._brightness_value = brightness_value
+        self._set_state("_brightness_value", brightness_value)
 
     @property
     def sun_height_value(self) -> float:
@@ -265,7 +289,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @sun_height_value.setter
     def sun_height_value(self, sun_height_value):
-        self._sun_height_value = sun_height_value
+        self._set_state("_sun_height_value", sun_height_value)
 
     @property
     def sun_direction_value(self) -> float:
@@ -273,7 +297,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @sun_direction_value.setter
     def sun_direction_value(self, sun_direction_value):
-        self._sun_direction_value = sun_direction_value
+        self._set_state("_sun_direction_value", sun_direction_value)
 
     @property
     def rain_detection_value(self) -> bool:
@@ -281,7 +305,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @rain_detection_value.setter
     def rain_detection_value(self, rain_detection_value):
-        self._rain_detection_value = rain_detection_value
+        self._set_state("_rain_detection_value", rain_detection_value)
 
     @property
     def sun_detection_value(self) -> bool:
@@ -289,7 +313,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @sun_detection_value.setter
     def sun_detection_value(self, sun_detection_value):
-        self._sun_detection_value = sun_detection_value
+        self._set_state("_sun_detection_value", sun_detection_value)
 
     @property
     def contact_state_value(self) -> ContactState:
@@ -297,7 +321,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @contact_state_value.setter
     def contact_state_value(self, contact_state_value):
-        self._contact_state_value = contact_state_value
+        self._set_state("_contact_state_value", contact_state_value)
 
     @property
     def battery_level_value(self) -> float:
@@ -305,7 +329,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @battery_level_value.setter
     def battery_level_value(self, battery_level_value):
-        self._battery_level_value = battery_level_value
+        self._set_state("_battery_level_value", battery_level_value)
 
     @property
     def motion_detection_value(self) -> bool:
@@ -313,7 +337,7 @@ class HomePilotSensor(HomePilotDevice):
 
     @motion_detection_value.setter
     def motion_detection_value(self, motion_detection_value):
-        self._motion_detection_value = motion_detection_value
+        self._set_state("_motion_detection_value", motion_detection_value)
 
     @property
     def smoke_detection_value(self) -> bool:
@@ -321,4 +345,4 @@ class HomePilotSensor(HomePilotDevice):
 
     @smoke_detection_value.setter
     def smoke_detection_value(self, smoke_detection_value):
-        self._smoke_detection_value = smoke_detection_value
+        self._set_state("_smoke_detection_value", smoke_detection_value)
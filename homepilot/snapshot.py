@@ -0,0 +1,180 @@
+""" Columnar snapshots of the state of all devices of a manager """
+import math
+from array import array
+from copy import copy
+from enum import Enum
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Device attributes captured as snapshot columns
+SNAPSHOT_FIELDS = (
+    "available",
+    "cover_position",
+    "cover_tilt_position",
+    "is_on",
+    "brightness",
+    "temperature_value",
+    "target_temperature_value",
+    "auto_mode_value",
+    "relais_status",
+    "battery_level_value",
+    "battery_low_value",
+    "wind_speed_value",
+    "brightness_value",
+    "sun_height_value",
+    "sun_direction_value",
+    "rain_detection_value",
+    "sun_detection_value",
+    "contact_state_value",
+    "motion_detection_value",
+    "smoke_detection_value",
+)
+
+NAN = float("nan")
+
+
+def _number(value) -> float:
+    """Column value of an attribute: booleans are 0/1, enums their value and
+    missing values NaN"""
+    if value is None:
+        return NAN
+    if isinstance(value, Enum):
+        value = value.value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _column(values: Iterable[float]):
+    if numpy is not None:
+        column = numpy.fromiter(values, dtype=numpy.float64)
+        column.flags.writeable = False
+        return column
+    return array("d", values)
+
+
+def _copy_column(column):
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return numpy.array(column)
+    return copy(column)
+
+
+def _freeze(column) -> None:
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        column.flags.writeable = False
+
+
+class FleetSnapshot:
+    """Immutable columnar view of the state of all devices: one float64 column
+    per field of SNAPSHOT_FIELDS (a read-only NumPy array when NumPy is
+    installed, an array.array otherwise) and the row of every did"""
+
+    __slots__ = ("_dids", "_index", "_columns")
+
+    def __init__(
+        self, dids: Tuple[str, ...], index: Dict[str, int], columns: Dict[str, array]
+    ) -> None:
+        self._dids = dids
+        self._index = index
+        self._columns = columns
+
+    def __getitem__(self, field):
+        return self._columns[field]
+
+    def __contains__(self, did) -> bool:
+        return did in self._index
+
+    def __len__(self) -> int:
+        return len(self._dids)
+
+    def row(self, did) -> Dict[str, float]:
+        """Returns the values of all fields of a device"""
+        row = self._index[did]
+        return {field: column[row] for field, column in self._columns.items()}
+
+    @property
+    def dids(self) -> Tuple[str, ...]:
+        return self._dids
+
+    @property
+    def index(self) -> Dict[str, int]:
+        return self._index
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(self._columns)
+
+
+def changed_values(previous: FleetSnapshot | None, snapshot: FleetSnapshot):
+    """Yields the (did, field, value) of snapshot that differ from previous,
+    skipping missing (NaN) values"""
+    if previous is snapshot:
+        return
+    for field in snapshot.fields:
+        column = snapshot[field]
+        previous_column = previous[field] if previous is not None else None
+        for did, row in snapshot.index.items():
+            value = float(column[row])
+            if math.isnan(value):
+                continue
+            if previous_column is not None and did in previous.index:
+                if float(previous_column[previous.index[did]]) == value:
+                    continue
+            yield did, field, value
+
+
+class SnapshotTable:
+    """Keeps the latest FleetSnapshot of a set of devices, re-reading only the
+    devices whose revision changed since the previous snapshot"""
+
+    __slots__ = ("_snapshot", "_revisions")
+
+    def __init__(self) -> None:
+        self._snapshot = None
+        self._revisions: List[int | None] = []
+
+    def refresh(self, devices) -> FleetSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or tuple(devices) != snapshot.dids:
+            return self._rebuild(devices)
+        changed = [
+            (row, device, revision)
+            for row, (device, revision) in enumerate(
+                (device, device.revision) for device in devices.values()
+            )
+            if revision is None or revision != self._revisions[row]
+        ]
+        if not changed:
+            return snapshot
+        columns = {
+            field: _copy_column(column) for field, column in snapshot._columns.items()
+        }
+        for row, device, revision in changed:
+            for field, column in columns.items():
+                column[row] = _number(getattr(device, field, None))
+            self._revisions[row] = revision
+        for column in columns.values():
+            _freeze(column)
+        self._snapshot = FleetSnapshot(snapshot.dids, snapshot.index, columns)
+        return self._snapshot
+
+    def _rebuild(self, devices) -> FleetSnapshot:
+        dids = tuple(devices)
+        self._revisions = [device.revision for device in devices.values()]
+        self._snapshot = FleetSnapshot(
+            dids,
+            {did: row for row, did in enumerate(dids)},
+            {
+                field: _column(
+                    _number(getattr(device, field, None))
+                    for device in devices.values()
+                )
+                for field in SNAPSHOT_FIELDS
+            },
+        )
+        return self._snapshot
@@ -3,17 +3,26 @@ from .const import (
     APICAP_DEVICE_TYPE_LOC,
     APICAP_ID_DEVICE_LOC,
     APICAP_NAME_DEVICE_LOC,
-    APICAP_PING_CMD,
     APICAP_PROD_CODE_DEVICE_LOC,
     APICAP_PROT_ID_DEVICE_LOC,
     APICAP_VERSION_CFG,
-    SUPPORTED_DEVICES,
+    DEVTYPE_ACTUATOR,
 )
 from .api import HomePilotApi
+from .decoder import StateField, is_not_zero
 from .device import HomePilotDevice
+from .profile import get_profile
 
 
 class HomePilotSwitch(HomePilotDevice):
+    __slots__ = (
+        "_is_on",
+    )
+
+    _devtype: str = DEVTYPE_ACTUATOR
+    _state_fields = (
+        StateField(None, "statusesMap", "Position", "_is_on", is_not_zero, required=True),
+    )
     _is_on: bool
 
     def __init__(
@@ -55,20 +64,15 @@ class HomePilotSwitch(HomePilotDevice):
             uid=device_map[APICAP_PROT_ID_DEVICE_LOC]["value"],
             name=device_map[APICAP_NAME_DEVICE_LOC]["value"],
             device_number=device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"],
-            model=SUPPORTED_DEVICES[device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"]][
-                "name"
-            ]
-            if device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"] in SUPPORTED_DEVICES
-            else "Generic Device",
             fw_version=device_map[APICAP_VERSION_CFG]["value"]
             if APICAP_VERSION_CFG in device_map else "",
             device_group=device_map[APICAP_DEVICE_TYPE_LOC]["value"],
-            has_ping_cmd=APICAP_PING_CMD in device_map,
+            **get_profile(HomePilotSwitch, device_map)._asdict(),
         )
 
     async def update_state(self, state, api):
         await super().update_state(state, api)
-        self.is_on = state["statusesMap"]["Position"] != 0
+        self.reconcile_pending()
 
     @property
     def is_on(self) -> bool:
@@ -76,13 +80,19 @@ class HomePilotSwitch(HomePilotDevice):
 
     @is_on.setter
     def is_on(self, is_on):
-        self._is_on = is_on
+        self._set_state("_is_on", is_on)
 
-    async def async_turn_on(self) -> None:
+    async def async_turn_on(self, force: bool = False) -> None:
+        if self.is_redundant_command("is_on", True, force):
+            return
         await self.api.async_turn_on(self.did)
+        self.set_optimistic_value("is_on", True)
 
-    async def async_turn_off(self) -> None:
+    async def async_turn_off(self, force: bool = False) -> None:
+        if self.is_redundant_command("is_on", False, force):
+            return
         await self.api.async_turn_off(self.did)
+        self.set_optimistic_value("is_on", False)
 
     async def async_toggle(self) -> None:
         if self.is_on:
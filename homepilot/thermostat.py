@@ -1,5 +1,5 @@
 import asyncio
-from typing import List
+from typing import List, NamedTuple, Tuple
 from .const import (
     APICAP_AUTO_MODE_CFG,
     APICAP_BATT_VALUE_EVT,
@@ -13,34 +13,99 @@ from .const import (
     APICAP_TARGET_TEMPERATURE_CFG,
     APICAP_TEMPERATURE_INT_CFG,
     APICAP_VERSION_CFG,
-    SUPPORTED_DEVICES,
+    DEVTYPE_ACTUATOR,
 )
 from .api import HomePilotApi
+from .decoder import StateField, is_zero, tenths
 from .device import HomePilotDevice
+from .profile import get_model, get_profile, intern_profile
+
+
+class ThermostatProfile(NamedTuple):
+    model: str
+    has_ping_cmd: bool
+    has_auto_mode: bool
+    has_temperature: bool
+    min_temperature: float | None
+    max_temperature: float | None
+    has_target_temperature: bool
+    can_set_target_temperature: bool
+    min_target_temperature: float | None
+    max_target_temperature: float | None
+    step_target_temperature: float | None
+    has_battery_level: bool
+    has_relais_status: bool
+    has_temperature_thresh_cfg: Tuple[bool, ...]
+    temperature_thresh_cfg_min: Tuple[float | None, ...]
+    temperature_thresh_cfg_max: Tuple[float | None, ...]
+    temperature_thresh_cfg_step: Tuple[float | None, ...]
+
+
+def _temperature_thresh_cfg_ranges(capabilities):
+    """Returns the presence, min, max and step of the four temperature thresholds"""
+    thresholds = [
+        capabilities[f"TEMPERATURE_THRESH_{i}_CFG"]
+        if f"TEMPERATURE_THRESH_{i}_CFG" in capabilities else None
+        for i in range(1, 5)
+    ]
+    return {
+        "has_temperature_thresh_cfg": tuple(
+            threshold is not None for threshold in thresholds
+        ),
+        "temperature_thresh_cfg_min": tuple(
+            float(threshold["min_value"]) if threshold is not None else None
+            for threshold in thresholds
+        ),
+        "temperature_thresh_cfg_max": tuple(
+            float(threshold["max_value"]) if threshold is not None else None
+            for threshold in thresholds
+        ),
+        "temperature_thresh_cfg_step": tuple(
+            float(threshold["step_size"]) if threshold is not None else None
+            for threshold in thresholds
+        ),
+    }
 
 
 class HomePilotThermostat(HomePilotDevice):
-    _has_auto_mode: bool
+    __slots__ = (
+        "_auto_mode_value", "_temperature_value", "_target_temperature_value",
+        "_battery_level_value", "_relais_status", "_temperature_thresh_cfg_value",
+    )
+
+    _devtype: str = DEVTYPE_ACTUATOR
+    _profile_capabilities = tuple(
+        (name, field)
+        for name in (
+            APICAP_TEMPERATURE_INT_CFG,
+            APICAP_TARGET_TEMPERATURE_CFG,
+            *(f"TEMPERATURE_THRESH_{i}_CFG" for i in range(1, 5)),
+        )
+        for field in ("min_value", "max_value", "step_size")
+    )
+    _state_fields = (
+        StateField("has_temperature", "statusesMap", "acttemperatur", "_temperature_value",
+                   tenths, required=True),
+        StateField("has_target_temperature", "statusesMap", "Position",
+                   "_target_temperature_value", tenths, required=True),
+        StateField("has_auto_mode", "statusesMap", "Manuellbetrieb", "_auto_mode_value",
+                   is_zero, default=False),
+        StateField("has_battery_level", None, "batteryStatus", "_battery_level_value"),
+        StateField("has_relais_status", "statusesMap", "relaisstatus", "_relais_status",
+                   required=True),
+    )
+    _history_fields = (
+        ("temperature", "has_temperature", "_temperature_value"),
+        ("target_temperature", "has_target_temperature", "_target_temperature_value"),
+        ("battery_level", "has_battery_level", "_battery_level_value"),
+    )
     _auto_mode_value: bool
-    _has_temperature: bool
-    _min_temperature: float
-    _max_temperature: float
-    _has_target_temperature: bool
     _temperature_value: float
     _target_temperature_value: float
-    _max_target_temperature: float
-    _min_target_temperature: float
-    _step_target_temperature: float
-    _can_set_target_temperature: bool
-    _has_battery_level: bool
     _battery_level_value: float
-    _has_relais_status: bool
     _relais_status: float
-    _has_temperature_thresh_cfg: List[bool | None]
     _temperature_thresh_cfg_value: List[float | None]
-    _temperature_thresh_cfg_min: List[float | None]
-    _temperature_thresh_cfg_max: List[float | None]
-    _temperature_thresh_cfg_step: List[float | None]
+    _profile: ThermostatProfile
 
     def __init__(
         self,
@@ -65,6 +130,10 @@ class HomePilotThermostat(HomePilotDevice):
         has_battery_level: bool = False,
         has_relais_status: bool = False,
         capabilities=None,
+        has_temperature_thresh_cfg: Tuple[bool, ...] = (False,) * 4,
+        temperature_thresh_cfg_min: Tuple[float | None, ...] = (None,) * 4,
+        temperature_thresh_cfg_max: Tuple[float | None, ...] = (None,) * 4,
+        temperature_thresh_cfg_step: Tuple[float | None, ...] = (None,) * 4,
     ) -> None:
         super().__init__(
             api=api,
@@ -77,31 +146,30 @@ class HomePilotThermostat(HomePilotDevice):
             device_group=device_group,
             has_ping_cmd=has_ping_cmd,
         )
-        self._has_auto_mode = has_auto_mode
-        self._has_temperature = has_temperature
-        self._min_temperature = min_temperature
-        self._max_temperature = max_temperature
-        self._has_target_temperature = has_target_temperature
-        self._can_set_target_temperature = can_set_target_temperature
-        self._min_target_temperature = min_target_temperature
-        self._max_target_temperature = max_target_temperature
-        self._step_target_temperature = step_target_temperature
-        self._has_battery_level = has_battery_level
-        self._has_relais_status = has_relais_status
-        self._has_temperature_thresh_cfg = [None] * 4
+        self._profile = intern_profile(ThermostatProfile(
+            model,
+            has_ping_cmd,
+            has_auto_mode,
+            has_temperature,
+            min_temperature,
+            max_temperature,
+            has_target_temperature,
+            can_set_target_temperature,
+            min_target_temperature,
+            max_target_temperature,
+            step_target_temperature,
+            has_battery_level,
+            has_relais_status,
+            has_temperature_thresh_cfg,
+            temperature_thresh_cfg_min,
+            temperature_thresh_cfg_max,
+            temperature_thresh_cfg_step,
+        ))
+        if capabilities is not None:
+            self._profile = intern_profile(
+                self._profile._replace(**_temperature_thresh_cfg_ranges(capabilities))
+            )
         self._temperature_thresh_cfg_value = [None] * 4
-        self._temperature_thresh_cfg_min = [None] * 4
-        self._temperature_thresh_cfg_max = [None] * 4
-        self._temperature_thresh_cfg_step = [None] * 4
-        for i in range(1, 5):
-            if capabilities is not None and f"TEMPERATURE_THRESH_{i}_CFG" in capabilities \
-            and capabilities[f"TEMPERATURE_THRESH_{i}_CFG"] is not None:
-                self._has_temperature_thresh_cfg[i-1] = True
-                self._temperature_thresh_cfg_min[i-1] = float(capabilities[f"TEMPERATURE_THRESH_{i}_CFG"]["min_value"])
-                self._temperature_thresh_cfg_max[i-1] = float(capabilities[f"TEMPERATURE_THRESH_{i}_CFG"]["max_value"])
-                self._temperature_thresh_cfg_step[i-1] = float(capabilities[f"TEMPERATURE_THRESH_{i}_CFG"]["step_size"])
-            else:
-                self._has_temperature_thresh_cfg[i-1] = False
 
     @staticmethod
     def build_from_api(api: HomePilotApi, did: str):
@@ -118,14 +186,16 @@ class HomePilotThermostat(HomePilotDevice):
             uid=device_map[APICAP_PROT_ID_DEVICE_LOC]["value"],
             name=device_map[APICAP_NAME_DEVICE_LOC]["value"],
             device_number=device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"],
-            model=SUPPORTED_DEVICES[device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"]][
-                "name"
-            ]
-            if device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"] in SUPPORTED_DEVICES
-            else "Generic Device",
             fw_version=device_map[APICAP_VERSION_CFG]["value"]
             if APICAP_VERSION_CFG in device_map else "",
             device_group=device_map[APICAP_DEVICE_TYPE_LOC]["value"],
+            **get_profile(HomePilotThermostat, device_map)._asdict(),
+        )
+
+    @staticmethod
+    def derive_profile(device_map) -> ThermostatProfile:
+        return ThermostatProfile(
+            model=get_model(device_map),
             has_ping_cmd=APICAP_PING_CMD in device_map,
             has_auto_mode=APICAP_AUTO_MODE_CFG in device_map,
             has_temperature=APICAP_TEMPERATURE_INT_CFG in device_map,
@@ -153,102 +223,108 @@ class HomePilotThermostat(HomePilotDevice):
             and device_map[APICAP_TARGET_TEMPERATURE_CFG]["step_size"] is not None else None,
             has_battery_level=APICAP_BATT_VALUE_EVT in device_map,
             has_relais_status=APICAP_RELAIS_STATE_CFG in device_map,
-            capabilities=device_map,
+            **_temperature_thresh_cfg_ranges(device_map),
         )
 
     async def update_state(self, state, api):
         await super().update_state(state, api)
-        if self.has_temperature:
-            self.temperature_value = state["statusesMap"]["acttemperatur"] / 10
-        if self.has_target_temperature:
-            self.target_temperature_value = state["statusesMap"]["Position"] / 10
-        if self.has_auto_mode:
-            self.auto_mode_value = (
-                state["statusesMap"]["Manuellbetrieb"] == 0
-                if "Manuellbetrieb" in state["statusesMap"]
-                else False
-            )
-        if self.has_battery_level and "batteryStatus" in state:
-            self.battery_level_value = state["batteryStatus"]
-        if self.has_relais_status:
-            self.relais_status = state["statusesMap"]["relaisstatus"]
-        capabilities = HomePilotDevice.get_capabilities_map(await self.api.get_device(self.did))
+        self.reconcile_pending()
+
+    def update_config(self, device_map) -> bool:
+        values = list(self._temperature_thresh_cfg_value)
         for i in range(1, 5):
             if self.has_temperature_thresh_cfg[i-1]:
-                self.temperature_thresh_cfg_value[i-1] = float(capabilities[f"TEMPERATURE_THRESH_{i}_CFG"]["value"])
-
-    async def async_set_target_temperature(self, temperature) -> None:
+                if f"TEMPERATURE_THRESH_{i}_CFG" not in device_map:
+                    return False
+                values[i-1] = float(device_map[f"TEMPERATURE_THRESH_{i}_CFG"]["value"])
+        if values != self._temperature_thresh_cfg_value:
+            self._temperature_thresh_cfg_value = values
+            self._revision += 1
+        return True
+
+    async def async_set_target_temperature(self, temperature, force: bool = False) -> None:
+        if self.is_redundant_command("target_temperature_value", temperature, force):
+            return
         await self.api.async_set_target_temperature(self.did, temperature)
+        self.set_optimistic_value("target_temperature_value", temperature)
 
-    async def async_set_auto_mode(self, auto_mode) -> None:
+    async def async_set_auto_mode(self, auto_mode, force: bool = False) -> None:
+        if self.is_redundant_command("auto_mode_value", auto_mode, force):
+            return
         await self.api.async_set_auto_mode(self.did, auto_mode)
+        self.set_optimistic_value("auto_mode_value", auto_mode)
 
     async def async_set_temperature_thresh_cfg(self, thresh_number, temperature) -> None:
         await self.api.async_set_temperature_thresh_cfg(self.did, thresh_number, temperature)
+        self.config_stale = True
 
     @property
     def has_temperature(self) -> bool:
-        return self._has_temperature
+        return self._profile.has_temperature
 
     @property
     def has_auto_mode(self) -> bool:
-        return self._has_auto_mode
+        return self._profile.has_auto_mode
 
     @property
     def min_temperature(self) -> bool:
-        return self._min_temperature
+        return self._profile.min_temperature
 
     @property
     def max_temperature(self) -> bool:
-        return self._max_temperature
+        return self._profile.max_temperature
 
     @property
     def has_target_temperature(self) -> bool:
-        return self._has_target_temperature
+        return self._profile.has_target_temperature
 
     @property
     def has_battery_level(self) -> bool:
-        return self._has_battery_level
+        return self._profile.has_battery_level
 
     @property
     def has_relais_status(self) -> bool:
-        return self._has_relais_status
+        return self._profile.has_relais_status
+
+    @property
+    def has_config(self) -> bool:
+        return any(self.has_temperature_thresh_cfg)
 
     @property
-    def has_temperature_thresh_cfg(self) -> List[bool | None]:
-        return self._has_temperature_thresh_cfg
+    def has_temperature_thresh_cfg(self) -> Tuple[bool, ...]:
+        return self._profile.has_temperature_thresh_cfg
 
     @property
     def temperature_thresh_cfg_value(self) -> List[float | None]:
         return self._temperature_thresh_cfg_value
 
     @property
-    def temperature_thresh_cfg_min(self) -> List[float | None]:
-        return self._temperature_thresh_cfg_min
+    def temperature_thresh_cfg_min(self) -> Tuple[float | None, ...]:
+        return self._profile.temperature_thresh_cfg_min
 
     @property
-    def temperature_thresh_cfg_max(self) -> List[float | None]:
-        return self._temperature_thresh_cfg_max
+    def temperature_thresh_cfg_max(self) -> Tuple[float | None, ...]:
+        return self._profile.temperature_thresh_cfg_max
 
     @property
-    def temperature_thresh_cfg_step(self) -> List[float | None]:
-        return self._temperature_thresh_cfg_step
+    def temperature_thresh_cfg_step(self) -> Tuple[float | None, ...]:
+        return self._profile.temperature_thresh_cfg_step
 
     @property
     def can_set_target_temperature(self) -> bool:
-        return self._can_set_target_temperature
+        return self._profile.can_set_target_temperature
 
     @property
     def min_target_temperature(self) -> bool:
-        return self._min_target_temperature
+        return self._profile.min_target_temperature
 
     @property
     def max_target_temperature(self) -> bool:
-        return self._max_target_temperature
+        return self._profile.max_target_temperature
 
     @property
     def step_target_temperature(self) -> bool:
-        return self._step_target_temperature
+        return self._profile.step_target_temperature
 
     @property
     def auto_mode_value(self) -> bool:
@@ -256,7 +332,7 @@ class HomePilotThermostat(HomePilotDevice):
 
     @auto_mode_value.setter
     def auto_mode_value(self, auto_mode_value):
-        self._auto_mode_value = auto_mode_value
+        self._set_state("_auto_mode_value", auto_mode_value)
 
     @property
     def temperature_value(self) -> float:
@@ -264,7 +340,7 @@ class HomePilotThermostat(HomePilotDevice):
 
     @temperature_value.setter
     def temperature_value(self, temperature_value):
-        self._temperature_value = temperature_value
+        self._set_state("_temperature_value", temperature_value)
 
     @property
     def target_temperature_value(self) -> float:
@@ -272,7 +348,7 @@ class HomePilotThermostat(HomePilotDevice):
 
     @target_temperature_value.setter
     def target_temperature_value(self, target_temperature_value):
-        self._target_temperature_value = target_temperature_value
+        self._set_state("_target_temperature_value", target_temperature_value)
 
     @property
     def battery_level_value(self) -> float:
@@ -280,7 +356,7 @@ class HomePilotThermostat(HomePilotDevice):
 
     @battery_level_value.setter
     def battery_level_value(self, battery_level_value):
-        self._battery_level_value = battery_level_value
+        self._set_state("_battery_level_value", battery_level_value)
 
     @property
     def relais_status(self) -> float:
@@ -288,4 +364,4 @@ class HomePilotThermostat(HomePilotDevice):
 
     @relais_status.setter
     def relais_status(self, relais_status):
-        self._relais_status = relais_status
+        self._set_state("_relais_status", relais_status)
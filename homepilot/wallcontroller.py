@@ -1,4 +1,5 @@
 import asyncio
+from typing import Dict, List, NamedTuple, Tuple
 
 from .const import (
     APICAP_DEVICE_TYPE_LOC,
@@ -8,16 +9,44 @@ from .const import (
     APICAP_PROD_CODE_DEVICE_LOC,
     APICAP_PROT_ID_DEVICE_LOC,
     APICAP_VERSION_CFG,
-    SUPPORTED_DEVICES,
     APICAP_BATT_LOW_EVT,
+    DEVTYPE_TRANSMITTER,
 )
 from .api import HomePilotApi
+from .decoder import StateField
 from .device import HomePilotDevice
+from .profile import get_model, get_profile, intern_profile
 
 import logging
 _LOGGER = logging.getLogger(__name__)
 
+
+class KeyPressEvent(NamedTuple):
+    did: str
+    channel: int
+    timestamp: int
+
+
+class WallControllerProfile(NamedTuple):
+    model: str
+    has_ping_cmd: bool
+    has_battery_low: bool
+
+
 class HomePilotWallController(HomePilotDevice):
+    __slots__ = (
+        "_channels", "_pushed_channels", "_battery_low_value",
+    )
+
+    _devtype: str = DEVTYPE_TRANSMITTER
+    _state_fields = (
+        StateField("has_battery_low", None, "batteryLow", "_battery_low_value"),
+    )
+    _channels: Dict[int, int]
+    _pushed_channels: Tuple[int, ...]
+    _battery_low_value: bool
+    _profile: WallControllerProfile
+
     def __init__(
         self,
         api: HomePilotApi,
@@ -44,9 +73,20 @@ class HomePilotWallController(HomePilotDevice):
             has_ping_cmd=has_ping_cmd,
         )
         self._channels = channels
-        self._has_battery_low = has_battery_low
-        for channel in self._channels:
-            setattr(self, f"channel_{channel}", False)
+        self._pushed_channels = ()
+        self._profile = intern_profile(
+            WallControllerProfile(model, has_ping_cmd, has_battery_low)
+        )
+
+    def __getattr__(self, name):
+        # channel_<n> is True when key n was pushed since the previous update
+        if name.startswith("channel_") and name[8:].isdigit():
+            channel = int(name[8:])
+            if channel in self._channels:
+                return channel in self._pushed_channels
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
 
     @staticmethod
     def build_from_api(api: HomePilotApi, did: str):
@@ -67,33 +107,49 @@ class HomePilotWallController(HomePilotDevice):
             uid=device_map[APICAP_PROT_ID_DEVICE_LOC]["value"],
             name=device_map[APICAP_NAME_DEVICE_LOC]["value"],
             device_number=device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"],
-            model=SUPPORTED_DEVICES[device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"]][
-                "name"
-            ]
-            if device_map[APICAP_PROD_CODE_DEVICE_LOC]["value"] in SUPPORTED_DEVICES
-            else "Generic Device",
             fw_version=device_map[APICAP_VERSION_CFG]["value"]
             if APICAP_VERSION_CFG in device_map else "",
             device_group=device_map[APICAP_DEVICE_TYPE_LOC]["value"],
+            channels=channels,
+            **get_profile(HomePilotWallController, device_map)._asdict(),
+        )
+
+    @staticmethod
+    def derive_profile(device_map) -> WallControllerProfile:
+        return WallControllerProfile(
+            model=get_model(device_map),
             has_ping_cmd=APICAP_PING_CMD in device_map,
             has_battery_low=APICAP_BATT_LOW_EVT in device_map,
-            channels=channels,
         )
 
-    async def update_state(self, state, api):
-        await super().update_state(state, api)
-        if self.has_battery_low and "batteryLow" in state:
-            self.battery_low_value = state["batteryLow"]
-    
     async def update_channels(self):
         device_map = HomePilotDevice.get_capabilities_map(await self.api.get_device(self.did))
-        for i in range(len(device_map)):
+        self.update_channels_from_map(device_map)
+
+    def update_channels_from_map(self, device_map) -> List[KeyPressEvent]:
+        """Updates the channel states from a capabilities map of the device,
+        returns an event for every channel pushed since the last update"""
+        events = self.key_presses_from_map(device_map, self._channels)
+        pushed = {event.channel for event in events}
+        self._pushed_channels = tuple(
+            i for i in self._channels
+            if i in pushed
+            or (f"KEY_PUSH_CH{i}_EVT" not in device_map and i in self._pushed_channels)
+        )
+        return events
+
+    def key_presses_from_map(self, device_map, seen: Dict[int, int]) -> List[KeyPressEvent]:
+        """Returns an event for every channel whose last push in a capabilities
+        map of the device differs from its timestamp in seen, and updates
+        seen. The channel states of the device are left alone."""
+        events = []
+        for i in self._channels:
             if f"KEY_PUSH_CH{i}_EVT" in device_map:
-                keypush = False
-                if self._channels[i] != device_map[f"KEY_PUSH_CH{i}_EVT"]["timestamp"]:
-                    keypush = True
-                setattr(self, f"channel_{i}", keypush)
-                self._channels[i] = device_map[f"KEY_PUSH_CH{i}_EVT"]["timestamp"]
+                timestamp = device_map[f"KEY_PUSH_CH{i}_EVT"]["timestamp"]
+                if seen.get(i) != timestamp:
+                    events.append(KeyPressEvent(self.did, i, timestamp))
+                seen[i] = timestamp
+        return events
 
     @property
     def channels(self):
@@ -101,7 +157,7 @@ class HomePilotWallController(HomePilotDevice):
 
     @property
     def has_battery_low(self) -> bool:
-        return self._has_battery_low
+        return self._profile.has_battery_low
 
     @property
     def battery_low_value(self) -> bool:
@@ -109,4 +165,4 @@ class HomePilotWallController(HomePilotDevice):
 
     @battery_low_value.setter
     def battery_low_value(self, battery_low_value):
-        self._battery_low_value = battery_low_value
+        self._set_state("_battery_low_value", battery_low_value)
@@ -26,6 +26,7 @@ setuptools.setup(
     ],
     package_dir={"": "."},
     packages=setuptools.find_packages(where="."),
-    python_requires=">=3.6",
-    install_requires=["aiohttp~=3.8.1"]
+    python_requires=">=3.10",
+    install_requires=["aiohttp~=3.8.1"],
+    extras_require={"numpy": ["numpy"]},
 )
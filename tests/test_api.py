@@ -1,8 +1,13 @@
+import asyncio
 import json
+import time
+from unittest.mock import AsyncMock
 from aiohttp.cookiejar import CookieJar
 from aioresponses import CallbackResult, aioresponses
 import pytest
 from homepilot.api import AuthError, CannotConnect, HomePilotApi
+from homepilot.const import DEVTYPE_SENSOR
+from homepilot.scheduler import timed_requests
 
 TEST_HOST = "test_host"
 TEST_PASSWORD = "test_password"
@@ -16,6 +21,19 @@ class TestHomePilotApi:
         assert not test_instance.authenticated
         assert test_instance.cookie_jar is None
 
+    @pytest.mark.asyncio
+    async def test_authenticate_once(self, monkeypatch):
+        async def test_auth(host, password):
+            await asyncio.sleep(0)
+            return CookieJar()
+
+        mocked_test_auth = AsyncMock(side_effect=test_auth)
+        monkeypatch.setattr(HomePilotApi, "test_auth", mocked_test_auth)
+        instance = HomePilotApi(TEST_HOST, TEST_PASSWORD)
+        await asyncio.gather(*(instance.authenticate() for _ in range(3)))
+        assert instance.authenticated
+        mocked_test_auth.assert_called_once_with(TEST_HOST, TEST_PASSWORD)
+
     @pytest.mark.asyncio
     async def test_test_connection(self):
         TEST_HOST = "test_host"
@@ -175,6 +193,8 @@ class TestHomePilotApi:
                               "devices": [{"did": "1", "name": "name1"}]}
         response_sensors = {"response": "get_meters",
                             "meters": [{"did": "2", "name": "name2"}]}
+        response_transmitters = {"response": "get_transmitters",
+                                 "transmitters": []}
         with aioresponses() as mocked:
             instance: HomePilotApi = HomePilotApi(TEST_HOST, "")
             mocked.get(
@@ -187,10 +207,30 @@ class TestHomePilotApi:
                 status=200,
                 body=json.dumps(response_sensors)
             )
+            mocked.get(
+                f"http://{TEST_HOST}/v4/devices?devtype=Transmitter",
+                status=200,
+                body=json.dumps(response_transmitters)
+            )
             expected = {"1": {"did": "1", "name": "name1"},
                         "2": {"did": "2", "name": "name2"}}
             assert await instance.async_get_devices_state() == expected
 
+    @pytest.mark.asyncio
+    async def test_async_get_devices_state_devtypes(self):
+        response_sensors = {"response": "get_meters",
+                            "meters": [{"did": "2", "name": "name2"}]}
+        with aioresponses() as mocked:
+            instance: HomePilotApi = HomePilotApi(TEST_HOST, "")
+            mocked.get(
+                f"http://{TEST_HOST}/v4/devices?devtype=Sensor",
+                status=200,
+                body=json.dumps(response_sensors)
+            )
+            expected = {"2": {"did": "2", "name": "name2"}}
+            assert await instance.async_get_devices_state(
+                [DEVTYPE_SENSOR]) == expected
+
     def callback_ping(self, url, **kwargs):
         response = {"error_code": 0, "error_description": "OK", "payload": {}}
         return CallbackResult(
@@ -211,6 +251,25 @@ class TestHomePilotApi:
             )
             assert (await instance.async_ping(did))["error_code"] == 0
 
+    @pytest.mark.asyncio
+    async def test_timed_requests(self):
+        did = "1234"
+        with aioresponses() as mocked:
+            instance: HomePilotApi = HomePilotApi(TEST_HOST, "", frame_spacing=10)
+            mocked.put(
+                f"http://{TEST_HOST}/devices/{did}",
+                status=200,
+                callback=self.callback_ping
+            )
+            # the scheduler keeps the command waiting, not the request
+            instance.command_scheduler._tokens = 0.98
+            started = time.monotonic()
+            with timed_requests() as durations:
+                await instance.async_ping(did)
+            assert time.monotonic() - started >= 0.15
+            assert len(durations) == 1
+            assert durations[0] < 0.15
+
     def callback_pos_up(self, url, **kwargs):
         response = {"error_code": 0, "error_description": "OK", "payload": {}}
         return CallbackResult(
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from homepilot.capabilities import CAPABILITY_FIELDS, CapabilityMap
+
+
+class TestCapabilityMap:
+    @pytest.fixture
+    def device(self):
+        with open("tests/test_files/device_thermostat.json") as f:
+            yield json.load(f)["payload"]["device"]
+
+    def test_lookup(self, device):
+        capabilities = CapabilityMap(device)
+        assert len(capabilities) == len(device["capabilities"])
+        assert "TEMPERATURE_THRESH_1_CFG" in capabilities
+        assert "KEY_PUSH_CH1_EVT" not in capabilities
+        with pytest.raises(KeyError):
+            capabilities["KEY_PUSH_CH1_EVT"]
+
+    def test_capability_fields(self, device):
+        raw = device["capabilities"][0]
+        capability = CapabilityMap(device)[raw["name"]]
+        assert tuple(capability) == CAPABILITY_FIELDS
+        assert dict(capability) == {field: raw.get(field) for field in CAPABILITY_FIELDS}
+        assert capability.get("name") is None
+        with pytest.raises(KeyError):
+            capability["name"]
@@ -1,10 +1,12 @@
 import asyncio
 import json
-from unittest.mock import MagicMock
+import time
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from homepilot.cover import HomePilotCover
+from homepilot.cover import CoverTravelModel, HomePilotCover
+from homepilot.device import HomePilotDevice
 
 
 class TestHomePilotCover:
@@ -31,6 +33,9 @@ class TestHomePilotCover:
         func_ping = asyncio.Future(loop=event_loop)
         func_ping.set_result(None)
         api.async_ping.return_value = func_ping
+        func_set_ventilation_position = asyncio.Future(loop=event_loop)
+        func_set_ventilation_position.set_result(None)
+        api.async_set_ventilation_position.return_value = func_set_ventilation_position
         yield api
 
     @pytest.mark.asyncio
@@ -76,6 +81,127 @@ class TestHomePilotCover:
         assert cover.is_closing is False
         assert cover.is_opening is False
         assert cover.available is False
+        assert mocked_api.get_device.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_update_config(self, mocked_api):
+        cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
+        assert cover.has_config is True
+        assert cover.update_config(HomePilotDevice.get_capabilities_map(
+            await mocked_api.get_device(1))) is True
+        assert cover.ventilation_position_mode is False
+        assert cover.ventilation_position == 32
+        assert cover.update_config({}) is False
+
+    @pytest.mark.asyncio
+    async def test_async_set_ventilation_position(self, mocked_api):
+        cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
+        assert cover.config_stale is False
+        await cover.async_set_ventilation_position(30)
+        mocked_api.async_set_ventilation_position.assert_called_with('1', 70)
+        assert cover.config_stale is True
+
+    @pytest.mark.asyncio
+    async def test_track_movement(self, mocked_api):
+        cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
+        await cover.update_state({
+            "statusesMap": {"Position": 100, "slatposition": 0},
+            "statusValid": True
+        }, mocked_api)
+        mocked_api.async_get_device_state = AsyncMock(side_effect=[
+            {"statusesMap": {"Position": position, "slatposition": 0},
+             "statusValid": True}
+            for position in (100, 80, 50, 20, 0)
+        ])
+        cover.track_movement = True
+        cover.track_interval = 0
+        await cover.async_open_cover()
+        assert cover.is_opening is True
+        assert cover.is_tracking_movement is True
+        while cover.is_tracking_movement:
+            await asyncio.sleep(0)
+        assert cover.cover_position == 100
+        assert cover.is_opening is False
+        assert mocked_api.async_get_device_state.call_count == 5
+
+    @pytest.mark.asyncio
+    async def test_track_movement_waits_for_start(self, mocked_api):
+        cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
+        await cover.update_state({
+            "statusesMap": {"Position": 100, "slatposition": 0},
+            "statusValid": True
+        }, mocked_api)
+        mocked_api.async_get_device_state = AsyncMock(side_effect=[
+            {"statusesMap": {"Position": position, "slatposition": 0},
+             "statusValid": True}
+            for position in (100, 100, 100, 100, 60, 60, 60, 60)
+        ])
+        cover.track_movement = True
+        cover.track_interval = 0
+        await cover.async_open_cover()
+        while cover.is_tracking_movement:
+            await asyncio.sleep(0)
+        assert cover.cover_position == 40
+        assert mocked_api.async_get_device_state.call_count == 8
+
+    @pytest.mark.asyncio
+    async def test_track_movement_never_starts(self, mocked_api, monkeypatch):
+        monkeypatch.setattr("homepilot.cover.TRACK_START_TIMEOUT", 0)
+        cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
+        await cover.update_state({
+            "statusesMap": {"Position": 100, "slatposition": 0},
+            "statusValid": True
+        }, mocked_api)
+        mocked_api.async_get_device_state = AsyncMock(return_value={
+            "statusesMap": {"Position": 100, "slatposition": 0},
+            "statusValid": True
+        })
+        cover.track_movement = True
+        cover.track_interval = 0
+        await cover.async_open_cover()
+        while cover.is_tracking_movement:
+            await asyncio.sleep(0)
+        assert cover.is_opening is False
+        assert mocked_api.async_get_device_state.call_count == 1
+
+    def test_travel_model(self):
+        model = CoverTravelModel()
+        model.start(0, 100, 10.0)
+        assert model.arrival_time() is None
+        model.observe(20, 12.0)
+        assert model.speed == 10.0
+        assert model.position_at(14.0) == 40
+        assert model.position_at(30.0) == 100
+        assert model.arrival_time() == 20.0
+        model.observe(100, 19.0)
+        assert model.moving is False
+        assert model.speed == 10.0
+        assert model.position_at(30.0) == 100
+
+    @pytest.mark.asyncio
+    async def test_predict_movement(self, mocked_api):
+        cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
+        await cover.update_state({
+            "statusesMap": {"Position": 100, "slatposition": 0},
+            "statusValid": True
+        }, mocked_api)
+        now = time.monotonic()
+        cover.travel_model.start(0, 100, now - 0.02)
+        cover.travel_model.observe(20, now - 0.01)
+        cover.travel_model.stop()
+        cover.travel_model.observe(0, now)
+        mocked_api.async_get_device_state = AsyncMock(return_value={
+            "statusesMap": {"Position": 0, "slatposition": 0},
+            "statusValid": True
+        })
+        cover.predict_movement = True
+        cover.track_interval = 0
+        await cover.async_open_cover()
+        assert 0 <= cover.cover_position <= 100
+        while cover.is_tracking_movement:
+            await asyncio.sleep(0.01)
+        assert cover.cover_position == 100
+        assert mocked_api.async_get_device_state.call_count == 1
 
     @pytest.mark.asyncio
     async def test_async_open_cover(self, mocked_api):
@@ -101,6 +227,22 @@ class TestHomePilotCover:
         await cover.async_set_cover_position(40)
         mocked_api.async_set_cover_position.assert_called_with('1', 60)
 
+    @pytest.mark.asyncio
+    async def test_skip_redundant_set_cover_position(self, mocked_api):
+        cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
+        cover.skip_redundant_commands = True
+        await cover.update_state({
+            "statusesMap": {"Position": 50, "slatposition": 0},
+            "statusValid": True
+        }, mocked_api)
+        await cover.async_set_cover_position(50)
+        mocked_api.async_set_cover_position.assert_not_called()
+        await cover.async_set_cover_position(40)
+        mocked_api.async_set_cover_position.assert_called_with('1', 60)
+        # moving back to the reported position while closing
+        await cover.async_set_cover_position(50)
+        mocked_api.async_set_cover_position.assert_called_with('1', 50)
+
     @pytest.mark.asyncio
     async def test_async_ping(self, mocked_api):
         cover = await HomePilotCover.async_build_from_api(mocked_api, 1)
@@ -0,0 +1,34 @@
+import pytest
+
+from homepilot.decoder import StateField, get_state_decoder, tenths
+
+
+class FakeDevice:
+    _state_fields = (
+        StateField(None, "statusesMap", "Position", "position", required=True),
+        StateField("has_temperature", "readings", "temperature", "temperature", tenths),
+        StateField("has_mode", "statusesMap", "mode", "mode", default="off"),
+    )
+
+    def __init__(self, has_temperature, has_mode):
+        self.has_temperature = has_temperature
+        self.has_mode = has_mode
+
+
+class TestStateDecoder:
+    def test_compiled_per_flags(self):
+        decoder = get_state_decoder(FakeDevice(True, False))
+        assert len(decoder) == 2
+        assert get_state_decoder(FakeDevice(True, False)) is decoder
+        assert len(get_state_decoder(FakeDevice(False, False))) == 1
+
+    def test_decode(self):
+        device = FakeDevice(True, True)
+        get_state_decoder(device).decode(
+            device, {"statusesMap": {"Position": 40}, "readings": {"temperature": 215}}
+        )
+        assert device.position == 40
+        assert device.temperature == 21.5
+        assert device.mode == "off"
+        with pytest.raises(KeyError):
+            get_state_decoder(device).decode(device, {"statusesMap": {}, "readings": {}})
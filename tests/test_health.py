@@ -0,0 +1,53 @@
+from homepilot.health import BACKOFF_BASE, BACKOFF_MAX, DeviceHealth
+
+
+class TestDeviceHealth:
+    def test_backoff(self):
+        health = DeviceHealth()
+        health.record_state(True, 0)
+        assert not health.backed_off
+        health.record_state(False, 100)
+        health.record_state(False, 110)
+        assert health.backed_off
+        assert health.failures == 1
+        assert not health.probe_due(100 + BACKOFF_BASE - 1)
+        assert health.probe_due(100 + BACKOFF_BASE)
+        health.record_probe(False, 200)
+        assert health.next_probe_at == 200 + 2 * BACKOFF_BASE
+        health.record_probe(True, 300)
+        assert health.failures == 2
+        assert health.next_probe_at == 300 + 2 * BACKOFF_BASE
+        for _ in range(20):
+            health.record_probe(False, 200)
+        assert health.next_probe_at == 200 + BACKOFF_MAX
+
+    def test_recovery(self):
+        health = DeviceHealth()
+        health.record_state(False, 0)
+        health.record_probe(False, BACKOFF_BASE)
+        health.record_state(True, 2 * BACKOFF_BASE)
+        assert not health.backed_off
+        assert health.failures == 0
+        assert not health.probe_due(10 * BACKOFF_BASE)
+
+    def test_record_ping(self):
+        health = DeviceHealth()
+        assert health.ping_latency is None
+        health.record_ping(True, 0.2, 10)
+        health.record_ping(False, 5, 20)
+        health.record_ping(False, 5, 30)
+        assert health.ping_latency == 0.2
+        assert health.ping_failures == 2
+        assert health.last_ping_at == 30
+        health.record_ping(True, 0.3, 40)
+        assert health.ping_latency == 0.3
+        assert health.ping_failures == 0
+
+    def test_failed_ping_backs_off(self):
+        health = DeviceHealth()
+        health.record_state(True, 0)
+        health.record_ping(False, 5, 10)
+        assert health.backed_off
+        assert health.next_probe_at == 10 + BACKOFF_BASE
+        health.record_state(True, 20)
+        assert not health.backed_off
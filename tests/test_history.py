@@ -0,0 +1,47 @@
+from homepilot.history import RingBuffer, RollingStats
+
+
+class TestRingBuffer:
+    def test_append_wraps(self):
+        buffer = RingBuffer(3)
+        assert buffer.latest() is None
+        for timestamp in range(5):
+            buffer.append(timestamp, timestamp * 10)
+        assert len(buffer) == 3
+        assert buffer.latest() == (4, 40)
+        timestamps, values = buffer.between()
+        assert list(timestamps) == [2, 3, 4]
+        assert list(values) == [20, 30, 40]
+
+    def test_between(self):
+        buffer = RingBuffer(4)
+        for timestamp in range(6):
+            buffer.append(timestamp, timestamp)
+        assert list(buffer.between(3, 4)[0]) == [3, 4]
+        assert list(buffer.between(3.5)[0]) == [4, 5]
+        assert list(buffer.between(end=2)[0]) == [2]
+        assert list(buffer.between(6)[0]) == []
+        assert list(buffer.between(4, 3)[0]) == []
+
+    def test_clock_going_back(self):
+        buffer = RingBuffer(4)
+        for timestamp, value in ((10, 1), (20, 2), (5, 3), (30, 4)):
+            buffer.append(timestamp, value)
+        assert list(buffer.between()[0]) == [10, 20, 20, 30]
+        assert list(buffer.between(15, 25)[1]) == [2, 3]
+        assert list(buffer.between(25)[1]) == [4]
+
+
+class TestRollingStats:
+    def test_window(self):
+        rolling = RollingStats(10)
+        assert rolling.stats(0).count == 0
+        for timestamp, value in ((0, 4.0), (4, 1.0), (8, 3.0), (12, 2.0)):
+            rolling.add(timestamp, value)
+        stats = rolling.stats(12)
+        assert (stats.count, stats.min, stats.max, stats.mean) == (3, 1.0, 3.0, 2.0)
+        assert stats.rate == 0.125
+        assert 1.0 < stats.ewma < 4.0
+        stats = rolling.stats(15)
+        assert (stats.count, stats.min, stats.max, stats.rate) == (2, 2.0, 3.0, -0.25)
+        assert rolling.stats(30).min is None
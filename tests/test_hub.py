@@ -1,7 +1,8 @@
 import asyncio
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 import pytest
-from homepilot.hub import HomePilotHub
+from aiohttp import ClientConnectionError
+from homepilot.hub import FirmwareUpdateProgress, HomePilotHub
 
 TEST_HOST = "test_host"
 
@@ -100,3 +101,62 @@ class TestHomePilotHub:
         cover = await HomePilotHub.async_build_from_api(mocked_api, 1)
         await cover.async_ping()
         mocked_api.async_ping.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_build_from_api_fetches_identity_once(self, mocked_api):
+        hub = await HomePilotHub.async_build_from_api(mocked_api, "-1")
+        assert hub.mac_address == "b0:1f:81:b1:21:7a"
+        assert hub.nodename == "testnodename"
+        mocked_api.async_get_fw_version.assert_called_once()
+        mocked_api.async_get_interfaces.assert_called_once()
+        mocked_api.async_get_nodename.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_async_watch_fw_update(self, mocked_api):
+        hub = await HomePilotHub.async_build_from_api(mocked_api, "-1")
+        mocked_api.async_get_fw_status = AsyncMock(side_effect=[
+            {"update_status": "DOWNLOADING", "version": "5.4.3", "download_progress": 10},
+            {"update_status": "DOWNLOADING", "version": "5.4.3", "download_progress": 10},
+            {"update_status": "DOWNLOADING", "version": "5.4.3", "download_progress": 80},
+            {"update_status": "NO_UPDATE_AVAILABLE", "version": "6.0.0"},
+        ])
+        updates = [
+            progress
+            async for progress in hub.async_watch_fw_update(0, 0)
+        ]
+        assert updates == [
+            FirmwareUpdateProgress("DOWNLOADING", 10),
+            FirmwareUpdateProgress("DOWNLOADING", 80),
+            FirmwareUpdateProgress("NO_UPDATE_AVAILABLE", False),
+        ]
+        assert hub.fw_version == "6.0.0"
+        assert hub.fw_update_available is False
+
+    @pytest.mark.asyncio
+    async def test_async_watch_fw_update_reboot(self, mocked_api):
+        hub = await HomePilotHub.async_build_from_api(mocked_api, "-1")
+        mocked_api.async_get_fw_status = AsyncMock(side_effect=[
+            {"update_status": "DOWNLOADING", "version": "5.4.3", "download_progress": 100},
+            ClientConnectionError(),
+        ])
+        mocked_api.test_connection = AsyncMock(return_value="error")
+        updates = [
+            progress
+            async for progress in hub.async_watch_fw_update(0, 0)
+        ]
+        assert updates[-1] == FirmwareUpdateProgress("DOWNLOADING", 100, rebooting=True)
+        mocked_api.test_connection.assert_called_once_with(TEST_HOST)
+
+    @pytest.mark.asyncio
+    async def test_async_watch_fw_update_connection_timeout(self, mocked_api):
+        hub = await HomePilotHub.async_build_from_api(mocked_api, "-1")
+        mocked_api.async_get_fw_status = AsyncMock(side_effect=[
+            {"update_status": "DOWNLOADING", "version": "5.4.3", "download_progress": 100},
+            asyncio.TimeoutError(),
+        ])
+        mocked_api.test_connection = AsyncMock(side_effect=asyncio.TimeoutError())
+        updates = [
+            progress
+            async for progress in hub.async_watch_fw_update(0, 0)
+        ]
+        assert updates[-1] == FirmwareUpdateProgress("DOWNLOADING", 100, rebooting=True)
@@ -1,14 +1,19 @@
 import asyncio
 import json
-from unittest.mock import MagicMock
+import math
+from unittest.mock import MagicMock, call
 import pytest
 from homepilot.api import HomePilotApi
+from homepilot.const import DEVTYPE_SENSOR
 from homepilot.cover import HomePilotCover
 from homepilot.hub import HomePilotHub
 
-from homepilot.manager import HomePilotManager
+from homepilot import snapshot as snapshot_module
+from homepilot.manager import CONFIG_REFRESH_INTERVAL, HomePilotManager
 from homepilot.sensor import ContactState, HomePilotSensor
 from homepilot.switch import HomePilotSwitch
+from homepilot.thermostat import HomePilotThermostat
+from homepilot.wallcontroller import HomePilotWallController, KeyPressEvent
 
 
 TEST_HOST = "test_host"
@@ -113,3 +118,253 @@ class TestHomePilotManager:
         assert manager.devices["1010072"].battery_level_value == 99
         assert not manager.devices["-1"].led_status
         assert manager.devices["-1"].fw_update_version == "5.4.9"
+
+    @pytest.mark.asyncio
+    async def test_hub_identity_shared(self, mocked_api):
+        mocked_api.async_get_interfaces.return_value = {
+            "interfaces": {"eth0": {"address": "b0:1f:81:b1:21:7a",
+                                    "enabled": True}}
+        }
+        mocked_api.async_get_nodename.return_value = {"nodename": "hub"}
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        assert await manager.get_hub_macaddress() == "b0:1f:81:b1:21:7a"
+        assert await manager.get_nodename() == "hub"
+        mocked_api.async_get_interfaces.assert_called_once()
+        mocked_api.async_get_nodename.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_update_configs(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        with open("tests/test_files/device_thermostat.json") as f:
+            thermostat_json = json.load(f)["payload"]["device"]
+        mocked_api.get_device.side_effect = None
+        mocked_api.get_device.return_value = thermostat_json
+        thermostat = await HomePilotThermostat.async_build_from_api(
+            mocked_api, "1010014")
+        manager.add_device(thermostat)
+        mocked_api.get_devices.return_value = [thermostat_json]
+        mocked_api.get_devices.reset_mock()
+        await manager.update_configs()
+        assert thermostat.temperature_thresh_cfg_value == \
+            [21.5, 22.0, 21.5, 17.0]
+        mocked_api.get_devices.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_update_configs_fallback(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        with open("tests/test_files/device_thermostat.json") as f:
+            thermostat_json = json.load(f)["payload"]["device"]
+        mocked_api.get_device.side_effect = None
+        mocked_api.get_device.return_value = thermostat_json
+        thermostat = await HomePilotThermostat.async_build_from_api(
+            mocked_api, "1010014")
+        manager.add_device(thermostat)
+        mocked_api.get_devices.return_value = []
+        mocked_api.get_device.reset_mock()
+        mocked_api.get_device.side_effect = ConnectionError()
+        await manager.update_configs()
+        calls = mocked_api.get_device.call_args_list
+        assert calls.count(call("1010014")) == 1
+        thermostat.config_stale = True
+        await manager.update_configs()
+        assert calls.count(call("1010014")) == 1
+
+    @pytest.mark.asyncio
+    async def test_config_refresh_interval(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        assert manager.config_refresh_interval == CONFIG_REFRESH_INTERVAL
+        assert manager.config_refresh_due()
+        await manager.update_configs()
+        assert not manager.config_refresh_due()
+        manager.config_refresh_interval = 0
+        assert manager.config_refresh_due()
+
+    @pytest.mark.asyncio
+    async def test_async_watch_key_presses(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        with open("tests/test_files/device_wallcontroller.json") as f:
+            controller_json = json.load(f)["payload"]["device"]
+        mocked_api.get_device.side_effect = None
+        mocked_api.get_device.return_value = controller_json
+        controller = await HomePilotWallController.async_build_from_api(
+            mocked_api, "1010055")
+        manager.add_device(controller)
+        pushed = json.loads(json.dumps(controller_json))
+        for capability in pushed["capabilities"]:
+            if capability["name"] == "KEY_PUSH_CH1_EVT":
+                capability["timestamp"] = 1647100500
+        mocked_api.get_devices.reset_mock()
+        mocked_api.get_device.reset_mock()
+        mocked_api.get_devices.side_effect = [[controller_json], [pushed]]
+        watcher = manager.async_watch_key_presses(interval=0)
+        event = await asyncio.wait_for(watcher.__anext__(), 1)
+        await watcher.aclose()
+        assert event == KeyPressEvent("1010055", 1, 1647100500)
+        assert mocked_api.get_devices.call_count == 2
+        mocked_api.get_device.assert_not_called()
+        # the device states are left to update_channels
+        assert controller.channel_1 is False
+        mocked_api.get_device.return_value = pushed
+        await controller.update_channels()
+        assert controller.channel_1 is True
+
+    @pytest.mark.asyncio
+    async def test_update_states_device_types(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        manager.devices["1"].available = True
+        with open("tests/test_files/sensors.json") as f:
+            sensors = {str(device["did"]): device
+                       for device in json.load(f)["meters"]}
+        mocked_api.async_get_devices_state.return_value = sensors
+        mocked_api.async_get_fw_status.reset_mock()
+        await manager.update_states(device_types=[DEVTYPE_SENSOR])
+        mocked_api.async_get_devices_state.assert_called_with(
+            [DEVTYPE_SENSOR])
+        mocked_api.async_get_fw_status.assert_not_called()
+        assert manager.devices["1010012"].temperature_value == 2.5
+        assert manager.devices["1"].available is True
+
+    @pytest.mark.asyncio
+    async def test_unavailable_device_backoff(self, mocked_api, monkeypatch):
+        monkeypatch.setattr("homepilot.health.BACKOFF_BASE", 0)
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        states = await mocked_api.async_get_devices_state()
+        del states["1010018"]
+        mocked_api.async_get_devices_state.return_value = states
+        await manager.update_states()
+        assert manager.devices["1010018"].available is False
+        assert manager.is_backed_off("1010018")
+        assert not manager.is_backed_off("1")
+        # probes run in the background of the poll
+        await manager._probe_task
+        mocked_api.async_ping.assert_called_with("1010018")
+        assert manager.health("1010018").failures == 1
+        mocked_api.async_ping.return_value = {"error_code": 22}
+        await manager.probe_unavailable_devices()
+        assert manager.health("1010018").failures == 2
+
+    @pytest.mark.asyncio
+    async def test_async_ping_devices(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        pinged = [did for did, dev in manager.devices.items() if dev.has_ping_cmd]
+        mocked_api.async_ping.reset_mock()
+        mocked_api.async_ping.side_effect = lambda did: (
+            {"error_code": 22} if did == pinged[0] else {"error_code": 0}
+        )
+        await manager.async_ping_devices(interval=0)
+        assert sorted(c.args[0] for c in mocked_api.async_ping.call_args_list) == sorted(
+            pinged
+        )
+        assert manager.health(pinged[0]).ping_failures == 1
+        assert manager.health(pinged[-1]).ping_failures == 0
+        assert manager.health(pinged[-1]).ping_latency is not None
+
+    @pytest.mark.asyncio
+    async def test_ping_service_all_backed_off(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        for did, device in manager.devices.items():
+            if device.has_ping_cmd:
+                manager.health(did).record_state(False, 0)
+        mocked_api.async_ping.reset_mock()
+        service = asyncio.ensure_future(manager.async_run_ping_service(interval=0.05))
+        # the service must leave the loop to the other tasks
+        await asyncio.wait_for(asyncio.sleep(0.2), timeout=1)
+        service.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await service
+        mocked_api.async_ping.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_find(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        cover = manager.devices["1"]
+        assert manager.find(cls=HomePilotCover) == [cover]
+        assert manager.find(cls=HomePilotCover, has_tilt=True) == [cover]
+        assert manager.find(uid=cover.uid) == [cover]
+        assert manager.find(name=cover.name, cls=HomePilotSwitch) == []
+        assert {d.did for d in manager.find(cls=HomePilotSensor)} == \
+            {"1010012", "1010072"}
+        assert {d.did for d in manager.find(has_temperature=True)} == {"1010012"}
+        assert len(manager.find()) == len(manager.devices)
+        manager.remove_device("1")
+        assert manager.find(cls=HomePilotCover) == []
+        assert manager.find(has_tilt=True) == []
+        manager.add_device(cover)
+        assert manager.find(cls=HomePilotCover, has_tilt=True) == [cover]
+        cover.has_tilt = False
+        assert manager.find(has_tilt=False, cls=HomePilotCover) == [cover]
+        cover.has_tilt = True
+        assert manager.find(has_tilt=True) == [cover]
+        del manager.devices["1"]
+        assert manager.find(cls=HomePilotCover) == []
+        manager.devices["1"] = cover
+        assert manager.find(has_tilt=True) == [cover]
+
+    @pytest.mark.asyncio
+    async def test_find_per_manager(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        cover = manager.devices["1"]
+        other = HomePilotManager(mocked_api)
+        other.add_device(manager.devices["1010012"])
+        manager.find(has_tilt=True)
+        other.find(has_tilt=True)
+        other_indexes = other._indexes
+        cover.has_tilt = False
+        assert manager.find(has_tilt=False, cls=HomePilotCover) == [cover]
+        other.find(has_tilt=False)
+        assert other._indexes is other_indexes
+
+    @pytest.mark.asyncio
+    async def test_devices_are_slotted(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        for device in manager.devices.values():
+            assert not hasattr(device, "__dict__"), type(device).__name__
+
+    @pytest.mark.asyncio
+    async def test_snapshot(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        await manager.update_states()
+        snapshot = manager.snapshot()
+        assert snapshot.dids == tuple(manager.devices)
+        assert snapshot["cover_position"][snapshot.index["1"]] == 35
+        assert snapshot["temperature_value"][snapshot.index["1010012"]] == 2.5
+        assert snapshot.row("1010072")["battery_level_value"] == 99
+        assert math.isnan(snapshot.row("1")["temperature_value"])
+        assert manager.snapshot() is snapshot
+
+        manager.devices["1010012"].available = False
+        refreshed = manager.snapshot()
+        assert refreshed.row("1010012")["available"] == 0
+        assert snapshot.row("1010012")["available"] == 1
+        assert refreshed["cover_position"][refreshed.index["1"]] == 35
+
+        manager.devices["1"].cover_position = 60
+        refreshed = manager.snapshot()
+        assert refreshed["cover_position"][refreshed.index["1"]] == 60
+        if snapshot_module.numpy is not None:
+            with pytest.raises(ValueError):
+                refreshed["cover_position"][0] = 0
+
+        # an identical report changes no revision, nor the snapshot
+        await manager.update_states()
+        refreshed = manager.snapshot()
+        revisions = {did: device.revision for did, device in manager.devices.items()}
+        await manager.update_states()
+        assert {
+            did: device.revision for did, device in manager.devices.items()
+        } == revisions
+        assert manager.snapshot() is refreshed
+
+        manager.remove_device("1")
+        assert "1" not in manager.snapshot()
+
+    @pytest.mark.asyncio
+    async def test_listeners(self, mocked_api):
+        manager = await HomePilotManager.async_build_manager(mocked_api)
+        snapshots = []
+        remove = manager.add_listener(snapshots.append)
+        await manager.update_states()
+        assert snapshots[-1]["cover_position"][snapshots[-1].index["1"]] == 35
+        remove()
+        manager.notify_listeners()
+        assert len(snapshots) == 1
@@ -0,0 +1,46 @@
+import math
+import time
+from array import array
+
+from homepilot.persistence import SQLiteSink
+from homepilot.snapshot import FleetSnapshot
+
+
+def snapshot(positions):
+    dids = tuple(positions)
+    return FleetSnapshot(
+        dids,
+        {did: row for row, did in enumerate(dids)},
+        {"cover_position": array("d", positions.values())},
+    )
+
+
+class TestSQLiteSink:
+    def test_writes_changes(self, tmp_path):
+        with SQLiteSink(str(tmp_path / "states.db"), flush_interval=0.01) as sink:
+            sink.write(snapshot({"1": 10, "2": math.nan}))
+            sink.write(snapshot({"1": 10, "2": 50}))
+            sink.write(snapshot({"1": 20, "2": 50}))
+        assert [value for _, value in sink.query("1", "cover_position")] == [10, 20]
+        assert [value for _, value in sink.query("2", "cover_position")] == [50]
+        assert sink.query("1", "cover_position", start=time.time() + 1) == []
+
+    def test_downsampling_and_retention(self, tmp_path):
+        path = str(tmp_path / "states.db")
+        with SQLiteSink(path, flush_interval=0.01) as sink:
+            pass
+        connection = sink._connect()
+        now = time.time()
+        hour = (now // 3600 - 3) * 3600
+        with connection:
+            connection.executemany(
+                "INSERT INTO readings VALUES ('1', 'cover_position', ?, ?)",
+                [(now - 100000, 0), (hour + 10, 10), (hour + 20, 30), (now, 40)],
+            )
+        connection.close()
+        with SQLiteSink(
+            path, flush_interval=0.01, retention=90000, downsample_after=3600,
+            downsample_interval=3600,
+        ) as sink:
+            pass
+        assert sink.query("1", "cover_position") == [(hour, 20), (now, 40)]
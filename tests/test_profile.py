@@ -0,0 +1,62 @@
+import copy
+import json
+
+from homepilot.cover import HomePilotCover
+from homepilot.device import HomePilotDevice
+from homepilot.profile import get_profile
+from homepilot.thermostat import HomePilotThermostat
+
+
+def load_device(path):
+    with open(path) as f:
+        return json.load(f)["payload"]["device"]
+
+
+class TestProfile:
+    def test_shared_by_same_model(self):
+        device = load_device("tests/test_files/device_thermostat.json")
+        first = get_profile(
+            HomePilotThermostat, HomePilotDevice.get_capabilities_map(device)
+        )
+        second = get_profile(
+            HomePilotThermostat,
+            HomePilotDevice.get_capabilities_map(copy.deepcopy(device)),
+        )
+        assert first is second
+        assert first.model == "DuoFern Room Thermostat"
+        assert first.min_target_temperature == 4.0
+
+    def test_capability_signature(self):
+        device = load_device("tests/test_files/device_thermostat.json")
+        other = copy.deepcopy(device)
+        for capability in other["capabilities"]:
+            if capability["name"] == "TARGET_TEMPERATURE_CFG":
+                capability["max_value"] = 30.0
+        first = get_profile(
+            HomePilotThermostat, HomePilotDevice.get_capabilities_map(device)
+        )
+        second = get_profile(
+            HomePilotThermostat, HomePilotDevice.get_capabilities_map(other)
+        )
+        assert first is not second
+        assert second.max_target_temperature == 30.0
+
+    def test_setter_keeps_profile_shared(self):
+        device_map = HomePilotDevice.get_capabilities_map(
+            load_device("tests/test_files/device_cover.json")
+        )
+        profile = get_profile(HomePilotCover, device_map)
+        cover = HomePilotCover(
+            api=None, did="1", uid="1", name="Cover", device_number="1",
+            fw_version="", device_group="2", **profile._asdict(),
+        )
+        other = HomePilotCover(
+            api=None, did="2", uid="2", name="Cover", device_number="1",
+            fw_version="", device_group="2", **profile._asdict(),
+        )
+        assert cover.profile is other.profile
+        cover.has_tilt = not profile.has_tilt
+        assert cover.has_tilt is not profile.has_tilt
+        assert other.profile is profile
+        other.has_tilt = not profile.has_tilt
+        assert cover.profile is other.profile
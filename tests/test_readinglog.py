@@ -0,0 +1,75 @@
+import math
+from array import array
+
+import pytest
+
+from homepilot.readinglog import RECORD, ReadingLogReader, ReadingLogWriter, FIELD_IDS
+from homepilot.snapshot import FleetSnapshot
+
+
+def snapshot(positions):
+    dids = tuple(positions)
+    return FleetSnapshot(
+        dids,
+        {did: row for row, did in enumerate(dids)},
+        {"cover_position": array("d", positions.values())},
+    )
+
+
+class TestReadingLog:
+    def test_write_and_read(self, tmp_path):
+        path = str(tmp_path / "readings.log")
+        with ReadingLogWriter(path) as writer:
+            writer.write(snapshot({"1": 10, "2": math.nan}))
+            writer.write(snapshot({"1": 10, "2": 50}))
+            writer.write(snapshot({"1": 20, "2": 50}))
+            assert len(writer) == 3
+        assert (tmp_path / "readings.log").stat().st_size == 16 + 3 * RECORD.size
+        with ReadingLogReader(path) as reader:
+            assert [(r.did, r.field, r.value) for r in reader.readings()] == [
+                (1, "cover_position", 10), (2, "cover_position", 50),
+                (1, "cover_position", 20),
+            ]
+            assert [r.value for r in reader.readings(did=1)] == [10, 20]
+            assert list(reader.readings(field="temperature_value")) == []
+
+    def test_time_range_and_reopen(self, tmp_path):
+        path = str(tmp_path / "readings.log")
+        with ReadingLogWriter(path) as writer:
+            for timestamp in range(10):
+                writer.append(1, FIELD_IDS["temperature_value"], timestamp, timestamp / 2)
+        with ReadingLogWriter(path) as writer:
+            writer.append(1, FIELD_IDS["temperature_value"], 10, 5)
+        with ReadingLogReader(path) as reader:
+            assert len(reader) == 11
+            assert [r.timestamp for r in reader.readings(start=3.5, end=6)] == [4, 5, 6]
+            assert [r.value for r in reader.readings(start=10)] == [5]
+
+    def test_clock_going_back(self, tmp_path):
+        path = str(tmp_path / "readings.log")
+        with ReadingLogWriter(path) as writer:
+            writer.append(1, FIELD_IDS["temperature_value"], 20, 1)
+        with ReadingLogWriter(path) as writer:
+            writer.append(1, FIELD_IDS["temperature_value"], 10, 2)
+            writer.append(1, FIELD_IDS["temperature_value"], 30, 3)
+        with ReadingLogReader(path) as reader:
+            assert [r.timestamp for r in reader.readings()] == [20, 20, 30]
+            assert [r.value for r in reader.readings(start=15, end=25)] == [1, 2]
+
+    def test_close_while_reading(self, tmp_path):
+        path = str(tmp_path / "readings.log")
+        with ReadingLogWriter(path) as writer:
+            for timestamp in range(3):
+                writer.append(1, FIELD_IDS["temperature_value"], timestamp, timestamp)
+        reader = ReadingLogReader(path)
+        readings = reader.readings()
+        assert next(readings).value == 0
+        reader.close()
+        with pytest.raises(ValueError):
+            next(readings)
+
+    def test_not_a_log(self, tmp_path):
+        path = tmp_path / "other.log"
+        path.write_bytes(b"x" * 64)
+        with pytest.raises(ValueError):
+            ReadingLogReader(str(path))
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from homepilot.scheduler import (
+    CommandScheduler,
+    Priority,
+    RequestLimiter,
+    bulk_commands,
+    command_priority,
+)
+
+
+class TestCommandScheduler:
+    @pytest.mark.asyncio
+    async def test_no_pacing(self):
+        scheduler = CommandScheduler()
+        start = time.monotonic()
+        for _ in range(10):
+            await scheduler.acquire()
+        assert time.monotonic() - start < 0.05
+
+    @pytest.mark.asyncio
+    async def test_burst_then_spacing(self):
+        scheduler = CommandScheduler(frame_spacing=0.05, burst_size=3)
+        released = []
+
+        async def command(i):
+            await scheduler.acquire()
+            released.append((i, time.monotonic()))
+
+        start = time.monotonic()
+        await asyncio.gather(*(command(i) for i in range(5)))
+        offsets = [t - start for _, t in released]
+        assert all(offset < 0.03 for offset in offsets[:3])
+        assert offsets[3] >= 0.04
+        assert offsets[4] >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        scheduler = CommandScheduler(frame_spacing=0.02, burst_size=1)
+        released = []
+
+        async def command(name, priority):
+            await scheduler.acquire(priority)
+            released.append(name)
+
+        await scheduler.acquire()
+        await asyncio.gather(
+            command("bulk1", Priority.BULK_COMMAND),
+            command("bulk2", Priority.BULK_COMMAND),
+            command("interactive", Priority.COMMAND),
+        )
+        assert released == ["interactive", "bulk1", "bulk2"]
+
+    def test_bulk_commands(self):
+        assert command_priority.get() == Priority.COMMAND
+        with bulk_commands():
+            assert command_priority.get() == Priority.BULK_COMMAND
+        assert command_priority.get() == Priority.COMMAND
+
+
+class TestRequestLimiter:
+    @pytest.mark.asyncio
+    async def test_unlimited(self):
+        limiter = RequestLimiter()
+        async with limiter.slot(Priority.POLL):
+            async with limiter.slot(Priority.POLL):
+                assert limiter.active == 0
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        limiter = RequestLimiter(max_concurrent=1)
+        served = []
+        release = asyncio.Event()
+
+        async def request(name, priority):
+            async with limiter.slot(priority):
+                served.append(name)
+
+        async def blocking_poll():
+            async with limiter.slot(Priority.POLL):
+                await release.wait()
+
+        blocker = asyncio.create_task(blocking_poll())
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(request("poll", Priority.POLL)),
+            asyncio.create_task(request("refresh", Priority.REFRESH)),
+            asyncio.create_task(request("stop", Priority.COMMAND)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.queued == 3
+        release.set()
+        await asyncio.gather(blocker, *waiting)
+        assert served == ["stop", "refresh", "poll"]
+        assert limiter.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter(self):
+        limiter = RequestLimiter(max_concurrent=1)
+        async with limiter.slot(Priority.POLL):
+            waiter = asyncio.create_task(
+                limiter.slot(Priority.COMMAND).__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+        assert limiter.active == 0
+        assert limiter.queued == 0
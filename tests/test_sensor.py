@@ -1,5 +1,6 @@
 import asyncio
 import json
+import time
 from unittest.mock import MagicMock
 
 import pytest
@@ -96,6 +97,32 @@ class TestHomePilotCover:
         assert env_sensor.temperature_value == 2.5
         assert env_sensor.available is True
 
+    @pytest.mark.asyncio
+    async def test_env_sensor_history(self, mocked_api_env_sensor, monkeypatch):
+        env_sensor: HomePilotSensor = await HomePilotSensor.async_build_from_api(mocked_api_env_sensor, 1)
+        env_sensor.history_size = 2
+        for now, wind_speed in ((100.0, 1.5), (110.0, 3.0), (120.0, 4.5)):
+            monkeypatch.setattr(time, "time", lambda now=now: now)
+            await env_sensor.update_state({
+                "readings": {"wind_speed": wind_speed, "temperature_primary": 2.5},
+                "statusValid": True
+            }, mocked_api_env_sensor)
+        # a missing reading and an invalid state are not recorded
+        monkeypatch.setattr(time, "time", lambda: 130.0)
+        await env_sensor.update_state({
+            "readings": {"temperature_primary": 2.5}, "statusValid": True
+        }, mocked_api_env_sensor)
+        await env_sensor.update_state({
+            "readings": {"wind_speed": 9.0}, "statusValid": False
+        }, mocked_api_env_sensor)
+        timestamps, values = env_sensor.history("wind_speed")
+        assert list(timestamps) == [110.0, 120.0]
+        assert list(values) == [3.0, 4.5]
+        assert list(env_sensor.history("wind_speed", start=115)[1]) == [4.5]
+        assert list(env_sensor.history("battery_level")[1]) == []
+        with pytest.raises(KeyError):
+            env_sensor.history("contact_state")
+
     @pytest.mark.asyncio
     async def test_contact_sensor_update_state(self, mocked_api_contact_sensor):
         contact_sensor: HomePilotSensor = await HomePilotSensor.async_build_from_api(mocked_api_contact_sensor, 1)
@@ -72,6 +72,70 @@ class TestHomePilotSwitch:
         await switch.async_turn_off()
         mocked_api.async_turn_off.assert_called_with('1010018')
 
+    @pytest.mark.asyncio
+    async def test_optimistic_turn_on(self, mocked_api):
+        switch = await HomePilotSwitch.async_build_from_api(mocked_api, 1)
+        off_state = {"statusesMap": {"Position": 0}, "statusValid": True}
+        await switch.update_state(off_state, mocked_api)
+        switch.optimistic = True
+        await switch.async_turn_on()
+        assert switch.is_on is True
+        assert switch.is_pending("is_on")
+        await switch.update_state(off_state, mocked_api)
+        assert switch.is_on is True
+        await switch.update_state({"statusesMap": {"Position": 100},
+                                   "statusValid": True}, mocked_api)
+        assert switch.is_on is True
+        assert not switch.is_pending("is_on")
+
+    @pytest.mark.asyncio
+    async def test_optimistic_rollback(self, mocked_api):
+        switch = await HomePilotSwitch.async_build_from_api(mocked_api, 1)
+        off_state = {"statusesMap": {"Position": 0}, "statusValid": True}
+        await switch.update_state(off_state, mocked_api)
+        switch.optimistic = True
+        switch.optimistic_timeout = 0
+        await switch.async_turn_on()
+        assert switch.is_on is True
+        await switch.update_state(off_state, mocked_api)
+        assert switch.is_on is False
+        assert not switch.is_pending("is_on")
+
+    @pytest.mark.asyncio
+    async def test_optimistic_timeout_without_report(self, mocked_api):
+        switch = await HomePilotSwitch.async_build_from_api(mocked_api, 1)
+        await switch.update_state({"statusesMap": {"Position": 0},
+                                   "statusValid": True}, mocked_api)
+        switch.optimistic = True
+        switch.optimistic_timeout = 0.01
+        await switch.async_turn_on()
+        assert switch.is_on is True
+        await asyncio.sleep(0.05)
+        assert switch.is_on is False
+        assert not switch.is_pending("is_on")
+
+    @pytest.mark.asyncio
+    async def test_skip_redundant_commands(self, mocked_api):
+        switch = await HomePilotSwitch.async_build_from_api(mocked_api, 1)
+        switch.skip_redundant_commands = True
+        await switch.update_state({"statusesMap": {"Position": 0},
+                                   "statusValid": True}, mocked_api)
+        await switch.async_turn_off()
+        mocked_api.async_turn_off.assert_not_called()
+        await switch.async_turn_off(force=True)
+        mocked_api.async_turn_off.assert_called_with('1010018')
+        switch.state_max_age = -1
+        mocked_api.async_turn_off.reset_mock()
+        await switch.async_turn_off()
+        mocked_api.async_turn_off.assert_called_with('1010018')
+        switch.state_max_age = 60
+        switch.optimistic = True
+        await switch.async_turn_on()
+        await switch.async_turn_off()
+        mocked_api.async_turn_on.reset_mock()
+        await switch.async_turn_on()
+        mocked_api.async_turn_on.assert_called_with('1010018')
+
     @pytest.mark.asyncio
     async def test_async_toggle(self, mocked_api):
         switch = await HomePilotSwitch.async_build_from_api(mocked_api, 1)
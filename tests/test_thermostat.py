@@ -1,9 +1,11 @@
 import asyncio
 import json
+import time
 from unittest.mock import MagicMock
 
 import pytest
 
+from homepilot.device import STATS_WINDOWS_MAX, HomePilotDevice
 from homepilot.thermostat import HomePilotThermostat
 
 
@@ -22,6 +24,9 @@ class TestHomePilotThermostat:
         func_set_auto_mode = asyncio.Future(loop=event_loop)
         func_set_auto_mode.set_result(None)
         api.async_set_auto_mode.return_value = func_set_auto_mode
+        func_set_temperature_thresh_cfg = asyncio.Future(loop=event_loop)
+        func_set_temperature_thresh_cfg.set_result(None)
+        api.async_set_temperature_thresh_cfg.return_value = func_set_temperature_thresh_cfg
         yield api
 
     @pytest.mark.asyncio
@@ -62,6 +67,66 @@ class TestHomePilotThermostat:
         assert thermostat.temperature_value == 21.2
         assert thermostat.target_temperature_value == 24.0
         assert thermostat.relais_status == 1
+        assert mocked_api.get_device.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_track_stats_without_history(self, mocked_api, monkeypatch):
+        thermostat: HomePilotThermostat = await HomePilotThermostat.async_build_from_api(mocked_api, 1)
+        monkeypatch.setattr(time, "time", lambda: 0.0)
+        assert thermostat.stats("target_temperature", window=600).max is None
+        thermostat.track_stats("temperature", window=600)
+        for now, temperature in ((10.0, 200), (20.0, 230)):
+            monkeypatch.setattr(time, "time", lambda now=now: now)
+            await thermostat.update_state({
+                "statusesMap": {"Position": 240, "acttemperatur": temperature,
+                                "relaisstatus": 1},
+                "statusValid": True
+            }, mocked_api)
+        stats = thermostat.stats("temperature", window=600)
+        assert (stats.count, stats.min, stats.max) == (2, 20.0, 23.0)
+
+    @pytest.mark.asyncio
+    async def test_stats(self, mocked_api, monkeypatch):
+        thermostat: HomePilotThermostat = await HomePilotThermostat.async_build_from_api(mocked_api, 1)
+        thermostat.history_size = 10
+        for now, temperature in ((0.0, 200), (300.0, 210)):
+            monkeypatch.setattr(time, "time", lambda now=now: now)
+            await thermostat.update_state({
+                "statusesMap": {"Position": 240, "acttemperatur": temperature,
+                                "relaisstatus": 1},
+                "statusValid": True
+            }, mocked_api)
+        stats = thermostat.stats("temperature", window=600)
+        assert (stats.count, stats.min, stats.max) == (2, 20.0, 21.0)
+        assert stats.rate == pytest.approx(1 / 300)
+        monkeypatch.setattr(time, "time", lambda: 400.0)
+        await thermostat.update_state({
+            "statusesMap": {"Position": 240, "acttemperatur": 190, "relaisstatus": 1},
+            "statusValid": True
+        }, mocked_api)
+        stats = thermostat.stats("temperature", window=600)
+        assert (stats.count, stats.min, stats.mean) == (3, 19.0, 20.0)
+        assert thermostat.stats("target_temperature", window=60).max == 24.0
+        for window in range(1, 2 * STATS_WINDOWS_MAX):
+            thermostat.stats("temperature", window=window)
+        assert len(thermostat._stats) == STATS_WINDOWS_MAX
+        assert ("temperature", 600) not in thermostat._stats
+
+    @pytest.mark.asyncio
+    async def test_update_config(self, mocked_api):
+        thermostat: HomePilotThermostat = await HomePilotThermostat.async_build_from_api(mocked_api, 1)
+        assert thermostat.has_config is True
+        with open("tests/test_files/device_thermostat.json") as f:
+            device_map = HomePilotDevice.get_capabilities_map(json.load(f)["payload"]["device"])
+        thermostat.update_config(device_map)
+        assert thermostat.temperature_thresh_cfg_value == [21.5, 22.0, 21.5, 17.0]
+
+    @pytest.mark.asyncio
+    async def test_async_set_temperature_thresh_cfg(self, mocked_api):
+        thermostat = await HomePilotThermostat.async_build_from_api(mocked_api, 1)
+        await thermostat.async_set_temperature_thresh_cfg(2, 20.5)
+        mocked_api.async_set_temperature_thresh_cfg.assert_called_with('1010014', 2, 20.5)
+        assert thermostat.config_stale is True
 
     @pytest.mark.asyncio
     async def test_async_set_target_temperature(self, mocked_api):
@@ -69,6 +134,14 @@ class TestHomePilotThermostat:
         await thermostat.async_set_target_temperature(10)
         mocked_api.async_set_target_temperature.assert_called_with('1010014', 10)
 
+    @pytest.mark.asyncio
+    async def test_optimistic_set_target_temperature(self, mocked_api):
+        thermostat = await HomePilotThermostat.async_build_from_api(mocked_api, 1)
+        thermostat.optimistic = True
+        await thermostat.async_set_target_temperature(22.5)
+        assert thermostat.target_temperature_value == 22.5
+        assert thermostat.is_pending("target_temperature_value")
+
     @pytest.mark.asyncio
     async def test_async_set_auto_mode(self, mocked_api):
         thermostat = await HomePilotThermostat.async_build_from_api(mocked_api, 1)
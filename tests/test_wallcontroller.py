@@ -0,0 +1,55 @@
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from homepilot.device import HomePilotDevice
+from homepilot.wallcontroller import HomePilotWallController, KeyPressEvent
+
+
+class TestHomePilotWallController:
+    @pytest.fixture
+    def mocked_api(self, event_loop):
+        f = open("tests/test_files/device_wallcontroller.json")
+        j = json.load(f)
+        api = MagicMock()
+        func_get_device = asyncio.Future(loop=event_loop)
+        func_get_device.set_result(j["payload"]["device"])
+        api.get_device.return_value = func_get_device
+        yield api
+
+    @pytest.mark.asyncio
+    async def test_build_from_api(self, mocked_api):
+        controller = await HomePilotWallController.async_build_from_api(mocked_api, 1)
+        assert controller.did == "1010055"
+        assert controller.uid == "a1b2c3"
+        assert controller.name == "Wall Controller Hall"
+        assert controller.device_number == "32501974"
+        assert controller.device_group == "10"
+        assert controller.model == "DuoFern Multiple Wall Controller BAT"
+        assert controller.has_battery_low is True
+        assert controller.channels == {1: 1647100001, 2: 1647100002, 3: -1}
+
+    @pytest.mark.asyncio
+    async def test_update_channels_from_map(self, mocked_api):
+        controller = await HomePilotWallController.async_build_from_api(mocked_api, 1)
+        device = mocked_api.get_device.return_value.result()
+        device_map = HomePilotDevice.get_capabilities_map(device)
+        assert controller.update_channels_from_map(device_map) == []
+        for capability in device["capabilities"]:
+            if capability["name"] == "KEY_PUSH_CH2_EVT":
+                capability["timestamp"] = 1647100100
+        assert controller.update_channels_from_map(device_map) == [
+            KeyPressEvent("1010055", 2, 1647100100)
+        ]
+        assert controller.channel_2 is True
+        assert controller.channel_1 is False
+        assert controller.channels[2] == 1647100100
+
+    @pytest.mark.asyncio
+    async def test_channel_attributes(self, mocked_api):
+        controller = await HomePilotWallController.async_build_from_api(mocked_api, 1)
+        assert controller.channel_3 is False
+        with pytest.raises(AttributeError):
+            controller.channel_9